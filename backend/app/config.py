@@ -47,7 +47,18 @@ class Settings(BaseSettings):
     
     # Processing Limits
     max_liked_songs: int = 1000
-    batch_size: int = 50
+    batch_size: int = 100  # Tracks per language-detection prompt
+    processing_session_max: int = 10000          # In-memory status entries kept for idle/finished scans
+    processing_session_ttl_seconds: int = 3600   # Those entries expire after this; running scans never do
+    
+    # Gemini API Concurrency
+    gemini_concurrency: int = 4             # Max in-flight Gemini requests
+    gemini_requests_per_minute: int = 120   # Proactive throttle below Gemini's RPM quota
+    
+    # Gemini Batch Mode (first scans only: half price, results within 24h)
+    gemini_batch_mode: bool = False
+    gemini_batch_min_tracks: int = 200      # Smaller first scans stay synchronous
+    gemini_batch_poll_minutes: int = 15     # How often pending batches are checked
     
     # Rate Limiting (for FastAPI endpoints)
     rate_limit_requests: int = 10
@@ -58,6 +69,9 @@ class Settings(BaseSettings):
     spotify_read_limit: int = 80      # READ requests per 30 seconds
     spotify_write_limit: int = 30     # WRITE requests per 30 seconds
     spotify_batch_limit: int = 20     # BATCH requests per 30 seconds
+    spotify_concurrency: int = 8            # Max in-flight Spotify HTTP requests, and per fan-out (pages)
+    spotify_requests_per_second: float = 10  # Token-bucket cap on Spotify HTTP requests
+    use_audio_features: bool = False  # /audio-features is deprecated for new Spotify apps
     
     # User Processing Concurrency
     max_concurrent_users: int = 5     # Max users processing simultaneously
@@ -6,6 +6,7 @@ Handles:
 - Welcome emails after Spotify linking
 """
 
+import asyncio
 import logging
 from typing import Optional
 from datetime import datetime
@@ -95,7 +96,9 @@ class EmailService:
                     'Data': text_body
                 }
             
-            response = self.ses_client.send_email(
+            # boto3 is blocking; run it off the event loop so sends can overlap
+            response = await asyncio.to_thread(
+                self.ses_client.send_email,
                 Source=self._get_from_address(),
                 Destination={
                     'ToAddresses': [to_email]
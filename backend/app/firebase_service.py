@@ -56,6 +56,8 @@ class FirebaseService:
             self.users_collection = self.db.collection('users')
             self.scan_logs_collection = self.db.collection('scan_logs')
             self.artist_genres_collection = self.db.collection('artist_genres')
+            self.track_languages_collection = self.db.collection('track_languages')
+            self.pending_batches_collection = self.db.collection('pending_gemini_batches')
             
         except Exception as e:
             logger.error(f"Failed to initialize Firebase: {e}")
@@ -462,6 +464,9 @@ class FirebaseService:
             for doc in interest_docs:
                 doc.reference.delete()
             
+            # Delete any pending Gemini batch (holds the user's track list)
+            self.pending_batches_collection.document(firebase_uid).delete()
+            
             logger.info(f"Deleted account for user {firebase_uid[:8]}***")
             return True
         except Exception as e:
@@ -608,10 +613,26 @@ class FirebaseService:
     
     # ============== Artist Genre Cache ==============
     
+    @staticmethod
+    def _artist_doc_id(artist_name: str) -> Optional[str]:
+        """
+        Normalized artist name used as the artist_genres document ID.
+        
+        Returns None for names Firestore won't accept as an ID (empty, '.',
+        '..' or '__*__'), so callers can skip them.
+        """
+        doc_id = artist_name.lower().replace('/', '_').replace('\\', '_')[:100]
+        if doc_id in ('', '.', '..') or (len(doc_id) >= 4 and doc_id.startswith('__') and doc_id.endswith('__')):
+            return None
+        return doc_id
+    
     async def get_cached_artist_genres(self, artist_names: List[str]) -> Dict[str, str]:
         """
         Get cached genres for a list of artists.
         
+        Documents are fetched by ID in a single batched get instead of one
+        'name in [...]' query per 30 artists.
+        
         Args:
             artist_names: List of artist names to look up
             
@@ -623,26 +644,29 @@ class FirebaseService:
         
         cached_genres = {}
         
-        # Firestore 'in' queries are limited to 30 items
-        batch_size = 30
-        
-        for i in range(0, len(artist_names), batch_size):
-            batch_names = artist_names[i:i + batch_size]
-            
-            try:
-                # Query for artists in this batch
-                query = self.artist_genres_collection.where('name', 'in', batch_names)
-                docs = list(query.stream())
-                
-                for doc in docs:
-                    data = doc.to_dict()
-                    artist_name = data.get('name')
-                    genre = data.get('genre')
-                    if artist_name and genre:
+        # Several spellings can normalize to the same document
+        names_by_doc_id: Dict[str, List[str]] = {}
+        for artist_name in artist_names:
+            doc_id = self._artist_doc_id(artist_name)
+            if doc_id is not None:
+                names_by_doc_id.setdefault(doc_id, []).append(artist_name)
+        
+        if not names_by_doc_id:
+            return {}
+        
+        try:
+            refs = [self.artist_genres_collection.document(doc_id) for doc_id in names_by_doc_id]
+            
+            for doc in self.db.get_all(refs):
+                if not doc.exists:
+                    continue
+                genre = doc.to_dict().get('genre')
+                if genre:
+                    for artist_name in names_by_doc_id[doc.id]:
                         cached_genres[artist_name] = genre
                         
-            except Exception as e:
-                logger.warning(f"Failed to fetch cached genres batch: {e}")
+        except Exception as e:
+            logger.warning(f"Failed to fetch cached genres: {e}")
         
         logger.info(f"Found {len(cached_genres)}/{len(artist_names)} artists in cache")
         return cached_genres
@@ -670,7 +694,9 @@ class FirebaseService:
         
         for artist_name, genre in artist_genres.items():
             # Use a normalized version of artist name as document ID
-            doc_id = artist_name.lower().replace('/', '_').replace('\\', '_')[:100]
+            doc_id = self._artist_doc_id(artist_name)
+            if doc_id is None:
+                continue
             doc_ref = self.artist_genres_collection.document(doc_id)
             
             batch.set(doc_ref, {
@@ -695,6 +721,146 @@ class FirebaseService:
         
         logger.info(f"Saved {saved_count} artist genres to cache")
         return saved_count
+    
+    # ============== Track Language Cache ==============
+    
+    async def get_cached_track_languages(self, track_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get cached language detections for a list of tracks.
+        
+        A track's language never changes, so detections are cached globally
+        by Spotify track ID and shared between users.
+        
+        Args:
+            track_ids: List of Spotify track IDs to look up
+            
+        Returns:
+            Dict mapping track ID to {'language', 'is_instrumental'} (only for found tracks)
+        """
+        if not track_ids:
+            return {}
+        
+        cached_languages = {}
+        
+        try:
+            # One batched get by document ID for the whole list
+            refs = [self.track_languages_collection.document(track_id) for track_id in track_ids]
+            
+            for doc in self.db.get_all(refs):
+                if not doc.exists:
+                    continue
+                data = doc.to_dict()
+                language = data.get('language')
+                if language:
+                    cached_languages[doc.id] = {
+                        'language': language,
+                        'is_instrumental': data.get('is_instrumental', False)
+                    }
+                    
+        except Exception as e:
+            logger.warning(f"Failed to fetch cached track languages: {e}")
+        
+        logger.info(f"Found {len(cached_languages)}/{len(track_ids)} track languages in cache")
+        return cached_languages
+    
+    async def save_track_languages(self, track_languages: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Save track language detections to the global cache.
+        
+        Args:
+            track_languages: Dict mapping track ID to {'language', 'is_instrumental'}
+            
+        Returns:
+            Number of tracks saved
+        """
+        if not track_languages:
+            return 0
+        
+        now = datetime.now(timezone.utc)
+        
+        # Use batched writes for efficiency
+        batch = self.db.batch()
+        batch_count = 0
+        max_batch_size = 500  # Firestore batch limit
+        
+        for track_id, detection in track_languages.items():
+            batch.set(self.track_languages_collection.document(track_id), {
+                'language': detection['language'],
+                'is_instrumental': detection.get('is_instrumental', False),
+                'updated_at': now
+            })
+            batch_count += 1
+            
+            # Commit batch if we hit the limit
+            if batch_count >= max_batch_size:
+                batch.commit()
+                batch = self.db.batch()
+                batch_count = 0
+        
+        # Commit any remaining writes
+        if batch_count > 0:
+            batch.commit()
+        
+        logger.info(f"Saved {len(track_languages)} track languages to cache")
+        return len(track_languages)
+
+    
+    # ============== Gemini Batch Jobs ==============
+    
+    async def save_pending_language_batch(
+        self,
+        firebase_uid: str,
+        batch_name: str,
+        tracks: List[Dict[str, Any]],
+        batch_size: int,
+        cached_tracks: Optional[List[Dict[str, Any]]] = None
+    ) -> bool:
+        """
+        Persist a submitted Gemini language batch so the scan can resume later.
+        
+        Kept in its own collection (one doc per user) so the track payload
+        does not bloat the user document read on every request.
+        
+        Args:
+            firebase_uid: User ID
+            batch_name: Gemini batch job name
+            tracks: Serialized tracks in submission order
+            batch_size: Tracks per request, needed to rebuild the batches
+            cached_tracks: Serialized tracks whose language came from the cache
+        """
+        try:
+            self.pending_batches_collection.document(firebase_uid).set({
+                'batch_name': batch_name,
+                'tracks': tracks,
+                'cached_tracks': cached_tracks or [],
+                'batch_size': batch_size,
+                'created_at': datetime.now(timezone.utc)
+            })
+            logger.info(f"Saved pending Gemini batch for user {firebase_uid[:8]}***")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save pending Gemini batch: {e}")
+            return False
+    
+    async def get_pending_language_batch(self, firebase_uid: str) -> Optional[Dict[str, Any]]:
+        """Get the pending Gemini language batch for a user, if any."""
+        doc = self.pending_batches_collection.document(firebase_uid).get()
+        if doc.exists:
+            return doc.to_dict()
+        return None
+    
+    async def get_pending_language_batch_user_ids(self) -> List[str]:
+        """Get IDs of all users with a pending Gemini language batch."""
+        return [doc.id for doc in self.pending_batches_collection.select([]).stream()]
+    
+    async def delete_pending_language_batch(self, firebase_uid: str) -> bool:
+        """Remove a user's pending Gemini language batch once it's consumed."""
+        try:
+            self.pending_batches_collection.document(firebase_uid).delete()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete pending Gemini batch: {e}")
+            return False
 
 
 @lru_cache
@@ -1,15 +1,15 @@
 """Gemini AI service for language detection and artist genre classification using REST API.
 
 This service handles:
-1. Language detection for tracks
+1. Language detection for tracks (sync or via Batch Mode)
 2. Genre classification for artists
 """
 
 import json
 import logging
-from typing import List
+from typing import List, Dict, Any, Optional
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from .config import get_settings
 from .models import (
@@ -23,11 +23,62 @@ from .models import (
 
 logger = logging.getLogger(__name__)
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_API_URL = f"{GEMINI_API_BASE}/models/gemini-2.0-flash:generateContent"
+GEMINI_BATCH_URL = f"{GEMINI_API_BASE}/models/gemini-2.0-flash:batchGenerateContent"
+
+
+def gemini_retrying() -> AsyncRetrying:
+    """
+    Retry policy for Gemini generate calls.
+    
+    Callers run each attempt inside it, so any concurrency slot or rate-limit
+    token is taken per attempt and released during the backoff.
+    """
+    return AsyncRetrying(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential(multiplier=1, min=2, max=60),
+        retry=retry_if_exception_type((httpx.HTTPError, Exception)),
+        reraise=True
+    )
+
 
 # Valid genres for artist classification
 VALID_GENRES = [genre.value for genre in GenreName]
 
+# Genre list and rules shared by the artist and fused language prompts
+GENRE_GUIDE = """AVAILABLE GENRES (choose ONLY from this list):
+1. Pop - Mainstream pop artists, catchy melodies, chart-toppers
+2. Party - High energy party music, electronic dance music, club music artists
+3. Hip-Hop - Rap artists, hip-hop producers, trap, grime
+4. Rock - Rock bands, alternative rock, classic rock artists
+5. Romantic - Romantic ballad singers, love song specialists
+6. Indie - Independent artists, alternative music, non-mainstream
+7. Bollywood Party - High-energy Bollywood/Hindi party music, item songs
+8. Desi Indie - Indian indie artists, fusion, non-Bollywood Indian music
+9. Instrumental - Instrumental artists, orchestras, producers of instrumental music
+10. Bollywood Romantic - Romantic Bollywood/Hindi songs, melodious film music
+11. Desi Hip-Hop - Indian hip-hop artists, desi rap, regional and Hindi rap
+12. Soul - Soulful vocals, R&B-influenced artists, emotional and groove-based music
+13. Jazz - Jazz artists, smooth jazz, fusion, classic and contemporary jazz
+
+CLASSIFICATION RULES:
+- Each artist gets EXACTLY one genre
+- Indian hip-hop artists/rap artists → Desi Hip-Hop
+- Bollywood singers known for party songs → Bollywood Party
+- Bollywood singers known for romantic songs → Bollywood Romantic
+- Indian indie/fusion artists → Desi Indie
+- Western indie artists → Indie
+- If unsure, use the most fitting genre based on artist name patterns
+- Rappers and hip-hop artists → Hip-Hop
+- DJ/Electronic artists/High energy party music → Party
+- Rock artists → Rock
+- Romantic, love and ballad singers → Romantic
+- Soulful vocals → Soul
+- Jazz artists → Jazz
+- Pop artists → Mainstream pop artists, catchy melodies, chart-toppers
+- Instrumental artists → Instrumental artists, orchestras, producers of instrumental music"""
+
 
 class GeminiService:
     """Service for AI-powered language detection and artist genre classification using Gemini REST API."""
@@ -41,21 +92,33 @@ class GeminiService:
         """Close the HTTP client."""
         await self.client.aclose()
     
-    def _build_language_detection_prompt(self, tracks: List[Track]) -> str:
-        """Build the language detection prompt for Gemini."""
-        tracks_data = []
-        for track in tracks:
-            tracks_data.append({
-                "id": track.id,
-                "name": track.name,
-                "artists": track.artists,
-                "album": track.album
-            })
+    def _build_language_detection_prompt(
+        self,
+        tracks: List[Track],
+        classify_artists: Optional[List[str]] = None
+    ) -> str:
+        """
+        Build the language detection prompt for Gemini.
+        
+        Tracks are marshalled as compact numbered rows rather than pretty
+        printed JSON, so a single prompt can carry a large batch cheaply.
+        The model answers by row index instead of echoing Spotify IDs.
+        
+        When ``classify_artists`` is given, the same prompt also asks for the
+        genre of each of those artists so no separate genre call is needed.
+        """
+        if classify_artists:
+            return self._build_fused_prompt(tracks, classify_artists)
+        
+        rows = "\n".join(
+            f'{idx}: "{track.name}" — {", ".join(track.artists)} [{track.album}]'
+            for idx, track in enumerate(tracks)
+        )
         
         prompt = f"""You are a music language detection expert. Analyze each song and determine its PRIMARY language.
 
-TRACK DATA:
-{json.dumps(tracks_data, indent=2)}
+TRACKS (format: index: "track name" — artists [album]):
+{rows}
 
 INSTRUCTIONS:
 1. Identify the primary language of vocals for each track
@@ -64,11 +127,11 @@ INSTRUCTIONS:
 4. Look for language hints in the track name, artist name, and album name
 5. For Indian artists, identify specific regional languages rather than just labeling as "Indian"
 
-RESPOND WITH ONLY A JSON ARRAY in this exact format:
+RESPOND WITH ONLY A JSON ARRAY with one entry per track index, in this exact format:
 [
-  {{"track_id": "spotify_id_1", "language": "Hindi", "is_instrumental": false}},
-  {{"track_id": "spotify_id_2", "language": "English", "is_instrumental": false}},
-  {{"track_id": "spotify_id_3", "language": "Instrumental", "is_instrumental": true}}
+  {{"idx": 0, "language": "Hindi", "is_instrumental": false}},
+  {{"idx": 1, "language": "English", "is_instrumental": false}},
+  {{"idx": 2, "language": "Instrumental", "is_instrumental": true}}
 ]
 
 IMPORTANT:
@@ -79,44 +142,58 @@ IMPORTANT:
         
         return prompt
     
+    def _build_fused_prompt(self, tracks: List[Track], classify_artists: List[str]) -> str:
+        """Build a prompt that detects track languages and classifies artists in one call."""
+        rows = "\n".join(
+            f'{idx}: "{track.name}" — {", ".join(track.artists)} [{track.album}]'
+            for idx, track in enumerate(tracks)
+        )
+        
+        prompt = f"""You are a music expert. Determine the PRIMARY language of each song, and classify the listed artists into genres.
+
+TRACKS (format: index: "track name" — artists [album]):
+{rows}
+
+ARTISTS TO CLASSIFY:
+{json.dumps(classify_artists)}
+
+LANGUAGE INSTRUCTIONS:
+1. Identify the primary language of vocals for each track
+2. Common languages to detect: Hindi, English, Spanish, French, German, Italian, Portuguese, Japanese, Korean, Chinese, Arabic, Russian, Marathi, Bengali, Telugu, Tamil, Punjabi, Gujarati, Kannada, Malayalam
+3. If the track appears to be instrumental (no vocals), mark it as "Instrumental"
+4. Look for language hints in the track name, artist name, and album name
+5. For Indian artists, identify specific regional languages rather than just labeling as "Indian"
+
+{GENRE_GUIDE}
+
+RESPOND WITH ONLY A JSON OBJECT in this exact format:
+{{
+  "tracks": [
+    {{"idx": 0, "language": "Hindi", "is_instrumental": false}},
+    {{"idx": 1, "language": "Instrumental", "is_instrumental": true}}
+  ],
+  "artist_genres": [
+    {{"artist_name": "Artist Name 1", "genre": "Bollywood Romantic"}},
+    {{"artist_name": "Artist Name 2", "genre": "Pop"}}
+  ]
+}}
+
+IMPORTANT:
+- Each track must have exactly one language, using proper language names (capitalize first letter)
+- Mark as "Instrumental" if the track has no vocals
+- Every artist in ARTISTS TO CLASSIFY who performs on a Hindi, English or Instrumental track must appear in "artist_genres"; other artists may be left out
+- The genre MUST be exactly one of the 13 genres listed above, spelled exactly as shown"""
+        
+        return prompt
+    
     def _build_artist_genre_prompt(self, artists: List[str]) -> str:
         """Build the artist genre classification prompt for Gemini."""
         prompt = f"""You are a music genre classification expert. Classify each artist into EXACTLY ONE of the following genres based on their primary musical style:
 
-AVAILABLE GENRES (choose ONLY from this list):
-1. Pop - Mainstream pop artists, catchy melodies, chart-toppers
-2. Party - High energy party music, electronic dance music, club music artists
-3. Hip-Hop - Rap artists, hip-hop producers, trap, grime
-4. Rock - Rock bands, alternative rock, classic rock artists
-5. Romantic - Romantic ballad singers, love song specialists
-6. Indie - Independent artists, alternative music, non-mainstream
-7. Bollywood Party - High-energy Bollywood/Hindi party music, item songs
-8. Desi Indie - Indian indie artists, fusion, non-Bollywood Indian music
-9. Instrumental - Instrumental artists, orchestras, producers of instrumental music
-10. Bollywood Romantic - Romantic Bollywood/Hindi songs, melodious film music
-11. Desi Hip-Hop - Indian hip-hop artists, desi rap, regional and Hindi rap
-12. Soul - Soulful vocals, R&B-influenced artists, emotional and groove-based music
-13. Jazz - Jazz artists, smooth jazz, fusion, classic and contemporary jazz
-
 ARTISTS TO CLASSIFY:
 {json.dumps(artists, indent=2)}
 
-CLASSIFICATION RULES:
-- Each artist gets EXACTLY one genre
-- Indian hip-hop artists/rap artists → Desi Hip-Hop
-- Bollywood singers known for party songs → Bollywood Party
-- Bollywood singers known for romantic songs → Bollywood Romantic
-- Indian indie/fusion artists → Desi Indie
-- Western indie artists → Indie
-- If unsure, use the most fitting genre based on artist name patterns
-- Rappers and hip-hop artists → Hip-Hop
-- DJ/Electronic artists/High energy party music → Party
-- Rock artists → Rock
-- Romantic, love and ballad singers → Romantic
-- Soulful vocals → Soul
-- Jazz artists → Jazz
-- Pop artists → Mainstream pop artists, catchy melodies, chart-toppers
-- Instrumental artists → Instrumental artists, orchestras, producers of instrumental music
+{GENRE_GUIDE}
 
 RESPOND WITH ONLY A JSON ARRAY in this exact format:
 [
@@ -132,33 +209,161 @@ IMPORTANT:
         
         return prompt
     
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=2, max=60),
-        retry=retry_if_exception_type((httpx.HTTPError, Exception)),
-        reraise=True
-    )
-    async def detect_languages(self, tracks: List[Track]) -> BatchLanguageResult:
-        """Detect languages for a batch of tracks using Gemini AI."""
+    def _language_detection_request(
+        self,
+        tracks: List[Track],
+        classify_artists: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Build the generateContent request body for language detection."""
+        return {
+            "contents": [{
+                "parts": [{"text": self._build_language_detection_prompt(tracks, classify_artists)}]
+            }],
+            "generationConfig": {
+                "temperature": 0.2,  # Lower temperature for more consistent results
+                # Fused prompts also return one genre row per artist
+                "maxOutputTokens": 8192 if classify_artists else 4096,
+            }
+        }
+    
+    @staticmethod
+    def _extract_response_text(data: Dict[str, Any]) -> str:
+        """Extract the JSON payload text from a generateContent response."""
+        response_text = ""
+        if "candidates" in data and len(data["candidates"]) > 0:
+            candidate = data["candidates"][0]
+            if "content" in candidate and "parts" in candidate["content"]:
+                parts = candidate["content"]["parts"]
+                if len(parts) > 0 and "text" in parts[0]:
+                    response_text = parts[0]["text"].strip()
+        
+        # Extract JSON from response (handle markdown code blocks)
+        if "```json" in response_text:
+            response_text = response_text.split("```json")[1].split("```")[0]
+        elif "```" in response_text:
+            response_text = response_text.split("```")[1].split("```")[0]
+        
+        return response_text.strip()
+    
+    def _parse_language_detections(
+        self,
+        response_text: str,
+        tracks: List[Track]
+    ) -> BatchLanguageResult:
+        """
+        Parse Gemini's language detection JSON for a batch of tracks.
+        
+        Accepts either a plain array of detections or the fused object with
+        ``tracks`` and ``artist_genres`` keys.
+        
+        Raises:
+            json.JSONDecodeError: If the response is not valid JSON
+        """
+        detections_data = json.loads(response_text)
+        
+        artist_genres = []
+        if isinstance(detections_data, dict):
+            artist_genres = self._parse_artist_genres(detections_data.get("artist_genres", []))
+            detections_data = detections_data.get("tracks", [])
+        
+        detections = []
+        failed_ids = []
+        
+        for item in detections_data:
+            # Rows are referenced by index; map back to the Spotify track ID
+            idx = item.get("idx")
+            if isinstance(idx, int) and 0 <= idx < len(tracks):
+                track_id = tracks[idx].id
+            else:
+                track_id = item.get("track_id")
+            language = item.get("language", "English")
+            is_instrumental = item.get("is_instrumental", False)
+            
+            if track_id:
+                # Normalize language name
+                language = language.strip().title()
+                
+                # Handle instrumental case
+                if is_instrumental or language.lower() == "instrumental":
+                    language = "Instrumental"
+                    is_instrumental = True
+                
+                detections.append(LanguageDetectionResult(
+                    track_id=track_id,
+                    language=language,
+                    is_instrumental=is_instrumental
+                ))
+            else:
+                logger.warning(f"Missing track_id in detection result: {item}")
+        
+        # Handle any tracks that weren't detected
+        detected_ids = {d.track_id for d in detections}
+        for track in tracks:
+            if track.id not in detected_ids:
+                failed_ids.append(track.id)
+                logger.warning(f"No language detected for track {track.id}")
+        
+        logger.info(
+            f"Language detection complete: {len(detections)} detected, {len(failed_ids)} failed, "
+            f"{len(artist_genres)} artists classified"
+        )
+        
+        return BatchLanguageResult(
+            detections=detections,
+            failed_track_ids=failed_ids,
+            artist_genres=artist_genres
+        )
+    
+    def _parse_artist_genres(self, classifications_data: List[Dict[str, Any]]) -> List[ArtistGenreResult]:
+        """Parse artist genre rows, mapping unknown genres onto the valid list."""
+        classifications = []
+        
+        for item in classifications_data:
+            artist_name = item.get("artist_name")
+            genre = item.get("genre")
+            
+            if artist_name and genre:
+                # Validate genre is in our allowed list
+                if genre in VALID_GENRES:
+                    classifications.append(ArtistGenreResult(
+                        artist_name=artist_name,
+                        genre=genre
+                    ))
+                else:
+                    # Map to closest valid genre or default to Pop
+                    mapped_genre = self._map_to_valid_genre(genre)
+                    classifications.append(ArtistGenreResult(
+                        artist_name=artist_name,
+                        genre=mapped_genre
+                    ))
+                    logger.warning(f"Invalid genre '{genre}' for artist '{artist_name}', mapped to '{mapped_genre}'")
+        
+        return classifications
+    
+    async def detect_languages(
+        self,
+        tracks: List[Track],
+        classify_artists: Optional[List[str]] = None
+    ) -> BatchLanguageResult:
+        """
+        Detect languages for a batch of tracks using Gemini AI.
+        
+        Errors are raised, not retried; callers retry via gemini_retrying.
+        
+        Args:
+            tracks: Tracks to detect languages for
+            classify_artists: Uncached artists to classify by genre in the
+                same call; their genres are returned in ``artist_genres``
+        """
         if not self.api_key:
             logger.warning("Gemini API key not configured. Using fallback language detection.")
             return self._fallback_language_detection(tracks)
         
         try:
-            prompt = self._build_language_detection_prompt(tracks)
-            
             # Call Gemini REST API with API key in header (not URL)
             response = await self.client.post(
                 GEMINI_API_URL,
-                json={
-                    "contents": [{
-                        "parts": [{"text": prompt}]
-                    }],
-                    "generationConfig": {
-                        "temperature": 0.2,  # Lower temperature for more consistent results
-                        "maxOutputTokens": 4096,
-                    }
-                },
+                json=self._language_detection_request(tracks, classify_artists),
                 headers={
                     "Content-Type": "application/json",
                     "x-goog-api-key": self.api_key  # API key in header, not URL
@@ -169,67 +374,13 @@ IMPORTANT:
                 logger.error(f"Gemini API error: {response.status_code} - {response.text}")
                 return self._fallback_language_detection(tracks)
             
-            data = response.json()
-            
-            # Extract text from response
-            response_text = ""
-            if "candidates" in data and len(data["candidates"]) > 0:
-                candidate = data["candidates"][0]
-                if "content" in candidate and "parts" in candidate["content"]:
-                    parts = candidate["content"]["parts"]
-                    if len(parts) > 0 and "text" in parts[0]:
-                        response_text = parts[0]["text"].strip()
+            response_text = self._extract_response_text(response.json())
             
             if not response_text:
                 logger.error("Empty response from Gemini")
                 return self._fallback_language_detection(tracks)
             
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
-            
-            detections_data = json.loads(response_text.strip())
-            
-            detections = []
-            failed_ids = []
-            
-            for item in detections_data:
-                track_id = item.get("track_id")
-                language = item.get("language", "English")
-                is_instrumental = item.get("is_instrumental", False)
-                
-                if track_id:
-                    # Normalize language name
-                    language = language.strip().title()
-                    
-                    # Handle instrumental case
-                    if is_instrumental or language.lower() == "instrumental":
-                        language = "Instrumental"
-                        is_instrumental = True
-                    
-                    detections.append(LanguageDetectionResult(
-                        track_id=track_id,
-                        language=language,
-                        is_instrumental=is_instrumental
-                    ))
-                else:
-                    logger.warning(f"Missing track_id in detection result: {item}")
-            
-            # Handle any tracks that weren't detected
-            detected_ids = {d.track_id for d in detections}
-            for track in tracks:
-                if track.id not in detected_ids:
-                    failed_ids.append(track.id)
-                    logger.warning(f"No language detected for track {track.id}")
-            
-            logger.info(f"Language detection complete: {len(detections)} detected, {len(failed_ids)} failed")
-            
-            return BatchLanguageResult(
-                detections=detections,
-                failed_track_ids=failed_ids
-            )
+            return self._parse_language_detections(response_text, tracks)
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse Gemini response: {e}")
@@ -238,14 +389,121 @@ IMPORTANT:
             logger.error(f"Gemini language detection error: {e}")
             raise
     
-    @retry(
-        stop=stop_after_attempt(5),
-        wait=wait_exponential(multiplier=1, min=2, max=60),
-        retry=retry_if_exception_type((httpx.HTTPError, Exception)),
-        reraise=True
-    )
+    # ============== Batch Mode ==============
+    
+    async def submit_language_batch(self, track_batches: List[List[Track]]) -> str:
+        """
+        Submit language detection for many track batches as one Gemini batch job.
+        
+        Batch Mode trades latency (results within 24h) for half the price
+        and separate, much higher rate limits. Requests are sent inline and
+        keyed by their index in ``track_batches``.
+        
+        Returns:
+            The batch job name (e.g. "batches/abc123") to poll later
+        """
+        if not self.api_key:
+            raise Exception("Gemini API key not configured")
+        
+        requests = [
+            {
+                "request": self._language_detection_request(batch),
+                "metadata": {"key": f"batch-{i}"}
+            }
+            for i, batch in enumerate(track_batches)
+        ]
+        
+        response = await self.client.post(
+            GEMINI_BATCH_URL,
+            json={
+                "batch": {
+                    "display_name": "language-detection",
+                    "input_config": {"requests": {"requests": requests}}
+                }
+            },
+            headers={
+                "Content-Type": "application/json",
+                "x-goog-api-key": self.api_key
+            }
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Failed to create Gemini batch: {response.status_code} - {response.text}")
+        
+        batch_name = response.json().get("name")
+        if not batch_name:
+            raise Exception("Gemini batch creation returned no job name")
+        
+        logger.info(f"Submitted Gemini batch {batch_name} with {len(requests)} requests")
+        return batch_name
+    
+    async def get_language_batch_results(
+        self,
+        batch_name: str,
+        track_batches: List[List[Track]]
+    ) -> Optional[List[BatchLanguageResult]]:
+        """
+        Poll a language detection batch job.
+        
+        Args:
+            batch_name: Job name returned by submit_language_batch
+            track_batches: The same track batches that were submitted
+        
+        Returns:
+            One result per track batch (in order) once the job succeeded,
+            or None while it is still running
+        
+        Raises:
+            Exception: If the job failed, expired or was cancelled
+        """
+        response = await self.client.get(
+            f"{GEMINI_API_BASE}/{batch_name}",
+            headers={"x-goog-api-key": self.api_key}
+        )
+        
+        if response.status_code != 200:
+            raise Exception(f"Failed to get Gemini batch: {response.status_code} - {response.text}")
+        
+        data = response.json()
+        job_state = data.get("metadata", {}).get("state", "")
+        
+        if job_state.endswith(("_FAILED", "_CANCELLED", "_EXPIRED")):
+            raise Exception(f"Gemini batch {batch_name} ended in state {job_state}")
+        
+        if not data.get("done") and not job_state.endswith("_SUCCEEDED"):
+            logger.info(f"Gemini batch {batch_name} still running ({job_state})")
+            return None
+        
+        # Inline responses may be wrapped once more depending on API version
+        inlined = data.get("response", {}).get("inlinedResponses", [])
+        if isinstance(inlined, dict):
+            inlined = inlined.get("inlinedResponses", [])
+        
+        responses_by_key = {
+            item.get("metadata", {}).get("key"): item.get("response")
+            for item in inlined
+        }
+        
+        results = []
+        for i, batch in enumerate(track_batches):
+            batch_response = responses_by_key.get(f"batch-{i}")
+            response_text = self._extract_response_text(batch_response) if batch_response else ""
+            
+            if not response_text:
+                logger.error(f"Empty Gemini batch response {i}")
+                results.append(self._fallback_language_detection(batch))
+                continue
+            
+            try:
+                results.append(self._parse_language_detections(response_text, batch))
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to parse Gemini batch response {i}: {e}")
+                results.append(self._fallback_language_detection(batch))
+        
+        return results
+    
     async def classify_artists(self, artists: List[str]) -> BatchArtistGenreResult:
-        """Classify a batch of artists into genres using Gemini AI."""
+        """Classify a batch of artists into genres using Gemini AI (retried by the caller via gemini_retrying)."""
         if not artists:
             return BatchArtistGenreResult(classifications=[], failed_artists=[])
         
@@ -301,31 +559,9 @@ IMPORTANT:
             
             classifications_data = json.loads(response_text.strip())
             
-            classifications = []
+            classifications = self._parse_artist_genres(classifications_data)
             failed_artists = []
-            classified_names = set()
-            
-            for item in classifications_data:
-                artist_name = item.get("artist_name")
-                genre = item.get("genre")
-                
-                if artist_name and genre:
-                    # Validate genre is in our allowed list
-                    if genre in VALID_GENRES:
-                        classifications.append(ArtistGenreResult(
-                            artist_name=artist_name,
-                            genre=genre
-                        ))
-                        classified_names.add(artist_name.lower())
-                    else:
-                        # Map to closest valid genre or default to Pop
-                        mapped_genre = self._map_to_valid_genre(genre)
-                        classifications.append(ArtistGenreResult(
-                            artist_name=artist_name,
-                            genre=mapped_genre
-                        ))
-                        classified_names.add(artist_name.lower())
-                        logger.warning(f"Invalid genre '{genre}' for artist '{artist_name}', mapped to '{mapped_genre}'")
+            classified_names = {c.artist_name.lower() for c in classifications}
             
             # Handle any artists that weren't classified
             for artist in artists:
@@ -489,7 +725,8 @@ IMPORTANT:
         
         return BatchLanguageResult(
             detections=detections,
-            failed_track_ids=[]
+            failed_track_ids=[],
+            is_fallback=True
         )
     
     def _fallback_artist_classification(self, artists: List[str]) -> BatchArtistGenreResult:
@@ -93,6 +93,9 @@ class JobQueue:
         # Locks
         self._queue_lock = asyncio.Lock()
         
+        # Set whenever a job is pushed, so the idle worker wakes up early
+        self._wakeup = asyncio.Event()
+        
         # Worker task
         self._worker_task: Optional[asyncio.Task] = None
         self._running = False
@@ -153,37 +156,54 @@ class JobQueue:
         Returns:
             Job ID
         """
+        scheduled_time = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+        
         async with self._queue_lock:
-            # Check if user already has a pending/running job
-            if user_id in self._user_jobs:
-                existing_job_id = self._user_jobs[user_id]
-                existing_job = self._jobs.get(existing_job_id)
-                
-                if existing_job and existing_job.status in [JobStatus.PENDING, JobStatus.RUNNING]:
-                    logger.warning(f"User {user_id} already has an active job: {existing_job_id}")
-                    return existing_job_id
-            
-            # Create new job
-            scheduled_time = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
-            
-            job = Job(
-                scheduled_time=scheduled_time,
-                priority=priority.value,
-                user_id=user_id,
-                job_type=job_type
-            )
-            
-            # Add to queue and tracking
-            heappush(self._queue, job)
-            self._jobs[job.job_id] = job
-            self._user_jobs[user_id] = job.job_id
-            
-            logger.info(
-                f"Enqueued job {job.job_id} for user {user_id} "
-                f"(type: {job_type}, priority: {priority.name}, delay: {delay_seconds}s)"
-            )
+            job_id = self._push_job(user_id, job_type, priority, scheduled_time)
+        
+        logger.info(
+            f"Enqueued job {job_id} for user {user_id} "
+            f"(type: {job_type}, priority: {priority.name}, delay: {delay_seconds}s)"
+        )
+        
+        return job_id
+    
+    def _push_job(
+        self,
+        user_id: str,
+        job_type: str,
+        priority: JobPriority,
+        scheduled_time: datetime
+    ) -> str:
+        """
+        Push a job onto the heap. Caller must hold the queue lock.
+        
+        Returns:
+            Job ID (the existing one if the user already has an active job)
+        """
+        # Check if user already has a pending/running job
+        if user_id in self._user_jobs:
+            existing_job_id = self._user_jobs[user_id]
+            existing_job = self._jobs.get(existing_job_id)
             
-            return job.job_id
+            if existing_job and existing_job.status in [JobStatus.PENDING, JobStatus.RUNNING]:
+                logger.warning(f"User {user_id} already has an active job: {existing_job_id}")
+                return existing_job_id
+        
+        job = Job(
+            scheduled_time=scheduled_time,
+            priority=priority.value,
+            user_id=user_id,
+            job_type=job_type
+        )
+        
+        # Add to queue and tracking
+        heappush(self._queue, job)
+        self._jobs[job.job_id] = job
+        self._user_jobs[user_id] = job.job_id
+        self._wakeup.set()
+        
+        return job.job_id
     
     async def enqueue_batch(
         self,
@@ -194,6 +214,9 @@ class JobQueue:
         """
         Enqueue jobs for multiple users with staggered scheduling.
         
+        Each job gets an absolute run time of now + i * stagger_seconds and
+        the whole batch is pushed under a single lock acquisition.
+        
         Args:
             user_ids: List of user IDs to process
             job_type: Type of job
@@ -202,17 +225,18 @@ class JobQueue:
         Returns:
             List of job IDs
         """
-        job_ids = []
-        
-        for i, user_id in enumerate(user_ids):
-            delay = i * stagger_seconds
-            job_id = await self.enqueue(
-                user_id=user_id,
-                job_type=job_type,
-                priority=JobPriority.NORMAL,
-                delay_seconds=delay
-            )
-            job_ids.append(job_id)
+        now = datetime.now(timezone.utc)
+        
+        async with self._queue_lock:
+            job_ids = [
+                self._push_job(
+                    user_id,
+                    job_type,
+                    JobPriority.NORMAL,
+                    now + timedelta(seconds=i * stagger_seconds)
+                )
+                for i, user_id in enumerate(user_ids)
+            ]
         
         logger.info(f"Enqueued {len(job_ids)} jobs with {stagger_seconds}s stagger")
         return job_ids
@@ -279,8 +303,8 @@ class JobQueue:
                     # Process with concurrency limit
                     asyncio.create_task(self._process_job_with_limit(job, semaphore))
                 else:
-                    # No jobs ready, wait a bit
-                    await asyncio.sleep(1)
+                    # No jobs ready, sleep until the next one is due or a new one arrives
+                    await self._wait_for_next_job()
                     
             except asyncio.CancelledError:
                 break
@@ -312,6 +336,20 @@ class JobQueue:
             
             return None
     
+    async def _wait_for_next_job(self) -> None:
+        """Sleep until the earliest scheduled job is due, or a job is enqueued."""
+        self._wakeup.clear()
+        
+        timeout = None
+        if self._queue:
+            delay = (self._queue[0].scheduled_time - datetime.now(timezone.utc)).total_seconds()
+            timeout = max(0.0, delay)
+        
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
     async def _process_job_with_limit(self, job: Job, semaphore: asyncio.Semaphore) -> None:
         """Process a job with concurrency limiting."""
         async with semaphore:
@@ -357,6 +395,7 @@ class JobQueue:
                 
                 async with self._queue_lock:
                     heappush(self._queue, job)
+                    self._wakeup.set()
                 
                 logger.info(
                     f"Job {job.job_id} re-queued for retry "
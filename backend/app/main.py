@@ -8,13 +8,14 @@ Authentication Flow:
 """
 
 import secrets
+import hashlib
 import logging
 import asyncio
-from typing import Optional
+from typing import Optional, Any
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
 
-from fastapi import FastAPI, HTTPException, Request, Depends, BackgroundTasks, Header
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse, JSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -24,7 +25,7 @@ from pydantic import BaseModel, validator
 
 from .config import get_settings
 from .models import StatusResponse
-from .spotify_service import SpotifyService
+from .spotify_service import SpotifyService, create_http_client
 from .processing_service import ProcessingService, get_processing_service, set_processing_service
 from .firebase_service import get_firebase_service
 from .email_service import get_email_service
@@ -97,10 +98,13 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     global spotify_service, processing_service, scheduler_service
     
-    spotify_service = SpotifyService()
-    processing_service = ProcessingService()
+    # One pooled HTTP client shared by every Spotify service instance
+    app.state.http = create_http_client()
+    
+    spotify_service = SpotifyService(http_client=app.state.http)
+    processing_service = ProcessingService(http_client=app.state.http)
     set_processing_service(processing_service)  # Set as global singleton
-    scheduler_service = get_scheduler_service()
+    scheduler_service = get_scheduler_service(http_client=app.state.http)
     
     # Start background scheduler and job queue (now async)
     await scheduler_service.start()
@@ -112,6 +116,7 @@ async def lifespan(app: FastAPI):
     await spotify_service.close()
     await processing_service.close()
     await scheduler_service.close()
+    await app.state.http.aclose()
     logger.info("Application shutdown")
 
 
@@ -146,7 +151,8 @@ def create_app() -> FastAPI:
         allow_origins=allowed_origins,
         allow_credentials=True,
         allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
-        allow_headers=["Authorization", "Content-Type"],
+        allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+        expose_headers=["ETag"],
     )
     
     return app
@@ -366,6 +372,8 @@ async def spotify_callback(
             refresh_token=refresh_token,
             expires_at=expires_at
         )
+        # The scan below must not reuse a token cached for a previous link
+        get_scheduler_service().invalidate_token(firebase_uid)
         
         logger.info(f"Spotify linked for user {firebase_uid[:8]}***")
         
@@ -462,6 +470,7 @@ async def delete_account(
     firebase = get_firebase_service()
     
     success = await firebase.delete_user_account(firebase_uid=current_user['uid'])
+    get_scheduler_service().invalidate_token(current_user['uid'])
     
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete account")
@@ -471,24 +480,67 @@ async def delete_account(
     return {"status": "deleted", "message": "Account deleted successfully"}
 
 
+# ============== Conditional Responses ==============
+
+def _weak_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from the values a response is derived from.
+    
+    Uses a stable digest (not hash()) so every worker process agrees.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    """Check whether the client already holds the representation for this ETag."""
+    return request.headers.get("if-none-match") == etag
+
+
 # ============== Subscription Endpoints ==============
 
+def _format_date(dt: Any) -> Optional[str]:
+    """Format a Firestore datetime as an ISO string (None for anything else)."""
+    # Firestore returns DatetimeWithNanoseconds, so an exact type check won't do
+    if isinstance(dt, datetime):
+        return dt.isoformat()
+    return None
+
+
 @app.get("/subscription/status", response_model=SubscriptionStatusResponse)
-async def get_subscription_status(current_user: dict = Depends(get_current_user)):
-    """Get current user's subscription status."""
+async def get_subscription_status(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get current user's subscription status.
     
-    def format_date(dt):
-        if isinstance(dt, datetime):
-            return dt.isoformat()
-        return None
+    Supports If-None-Match so polling clients get a bodiless 304
+    when nothing has changed since their last request.
+    """
+    status = current_user.get('subscription_status', 'none')
+    start_date = _format_date(current_user.get('subscription_start_date'))
+    end_date = _format_date(current_user.get('subscription_end_date'))
+    spotify_linked = bool(current_user.get('spotify_user_id'))
+    last_scan_at = _format_date(current_user.get('last_scan_at'))
+    total_songs_organized = current_user.get('total_songs_organized', 0)
+    
+    etag = _weak_etag(
+        current_user['uid'], status, start_date, end_date,
+        spotify_linked, last_scan_at, total_songs_organized
+    )
+    if _is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     
     return SubscriptionStatusResponse(
-        status=current_user.get('subscription_status', 'none'),
-        start_date=format_date(current_user.get('subscription_start_date')),
-        end_date=format_date(current_user.get('subscription_end_date')),
-        spotify_linked=bool(current_user.get('spotify_user_id')),
-        last_scan_at=format_date(current_user.get('last_scan_at')),
-        total_songs_organized=current_user.get('total_songs_organized', 0)
+        status=status,
+        start_date=start_date,
+        end_date=end_date,
+        spotify_linked=spotify_linked,
+        last_scan_at=last_scan_at,
+        total_songs_organized=total_songs_organized
     )
 
 
@@ -582,11 +634,21 @@ async def trigger_scan(
 @limiter.limit("60/minute")
 async def get_process_status(
     request: Request,
+    response: Response,
     current_user: dict = Depends(require_subscription),
     processing: ProcessingService = Depends(get_processing)
 ):
-    """Get current processing status for the user."""
+    """Get current processing status for the user (supports If-None-Match)."""
     state = processing.get_state(current_user['uid'])
+    
+    etag = _weak_etag(
+        state.status.value, state.progress, state.message, state.total_songs,
+        state.processed_songs, state.playlists_created, state.error
+    )
+    if _is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    
     return state.to_response()
 
 
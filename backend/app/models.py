@@ -1,5 +1,8 @@
 """Pydantic models for request/response validation."""
 
+import sys
+from functools import cached_property
+
 from pydantic import BaseModel
 from typing import Optional, List
 from enum import Enum
@@ -50,6 +53,16 @@ class Track(BaseModel):
     
     # Language detection result
     detected_language: Optional[str] = None
+    
+    @cached_property
+    def normalized_artists(self) -> List[str]:
+        """
+        Stripped, non-empty artist names, computed once per track.
+        
+        Names are interned so the artist map lookups done for every track
+        compare by identity first.
+        """
+        return [sys.intern(artist.strip()) for artist in self.artists if artist.strip()]
 
 
 class TrackClassification(BaseModel):
@@ -67,13 +80,6 @@ class LanguageDetectionResult(BaseModel):
     is_instrumental: bool = False
 
 
-class BatchLanguageResult(BaseModel):
-    """Result of language detection for a batch of tracks."""
-    
-    detections: List[LanguageDetectionResult]
-    failed_track_ids: List[str] = []
-
-
 class ArtistGenreResult(BaseModel):
     """Result of genre classification for an artist."""
     
@@ -81,6 +87,17 @@ class ArtistGenreResult(BaseModel):
     genre: str
 
 
+class BatchLanguageResult(BaseModel):
+    """Result of language detection for a batch of tracks."""
+    
+    detections: List[LanguageDetectionResult]
+    failed_track_ids: List[str] = []
+    # Genres for artists that were classified in the same Gemini call
+    artist_genres: List[ArtistGenreResult] = []
+    # True when produced by the heuristic fallback rather than Gemini
+    is_fallback: bool = False
+
+
 class BatchArtistGenreResult(BaseModel):
     """Result of genre classification for a batch of artists."""
     
@@ -101,6 +118,7 @@ class ProcessingStatus(str, Enum):
     IDLE = "idle"
     FETCHING_SONGS = "fetching_songs"
     DETECTING_LANGUAGES = "detecting_languages"
+    AWAITING_BATCH = "awaiting_batch"
     BUILDING_ARTIST_MAP = "building_artist_map"
     CLASSIFYING_ARTISTS = "classifying_artists"
     CREATING_PLAYLISTS = "creating_playlists"
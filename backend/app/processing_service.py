@@ -1,11 +1,12 @@
 """Playlist processing service that orchestrates the entire workflow.
 
 Classification Logic (updated):
-1. Detect language for all songs using Gemini
+1. Detect language for all songs using Gemini; uncached artists are
+   classified by genre in the same call
 2. Non-Hindi, Non-English, Non-Instrumental songs → {Language} playlists
 3. For Hindi, English, and Instrumental songs:
-   a. Build artist → songs map
-   b. Classify each artist into one of the defined genres using Gemini
+   a. Collect the unique artists
+   b. Classify any artist still missing a genre using Gemini
    c. Assign songs to playlists based on artist genre
 
 Playlists are named simply by genre or language (e.g., "Pop", "Hindi", "Spanish").
@@ -14,28 +15,38 @@ Existing playlists with matching names are reused, allowing songs to accumulate.
 Optimizations:
 - Incremental scanning: Only fetch new songs since last scan
 - Artist genre caching: Cached in Firebase, only call Gemini for new artists
+- Track language caching: Detections are cached globally by track ID
+- Pipelined fetch: language detection starts while later pages are fetched
+- Gemini Batch Mode (opt-in): large first scans submit language detection as a
+  batch job and are resumed by the scheduler once results are ready
 """
 
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
 
+import httpx
+from aiolimiter import AsyncLimiter
+from cachetools import LRUCache, TTLCache
+
 from .models import (
     Track, 
     ProcessingStatus, 
-    StatusResponse
+    StatusResponse,
+    BatchLanguageResult
 )
 from .spotify_service import SpotifyService
-from .gemini_service import GeminiService
+from .gemini_service import GeminiService, gemini_retrying
 from .firebase_service import get_firebase_service
 from .config import get_settings
 
 logger = logging.getLogger(__name__)
 
-# Languages that get classified by artist genre into the 10 genres
-CLASSIFIABLE_LANGUAGES = {"hindi", "english", "instrumental"}
+# Languages that get classified by artist genre into the 10 genres.
+# GeminiService returns language names title-cased, so they are compared as-is.
+CLASSIFIABLE_LANGUAGES = frozenset({"Hindi", "English", "Instrumental"})
 
 
 class ProcessingState:
@@ -66,24 +77,111 @@ class ProcessingState:
 class ProcessingService:
     """Service that handles the complete processing pipeline."""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.settings = get_settings()
-        self.spotify = SpotifyService()
+        self.spotify = SpotifyService(http_client=http_client)
         self.gemini = GeminiService()
         
-        # In-memory state per session (keyed by user_id)
-        self.sessions: Dict[str, ProcessingState] = {}
+        # Gemini limits are per API key, so they are shared by all sessions
+        self._gemini_semaphore = asyncio.Semaphore(self.settings.gemini_concurrency)
+        self._gemini_limiter = AsyncLimiter(self.settings.gemini_requests_per_minute, 60)
+        
+        # Artist genres seen by this process, checked before Firestore
+        self._artist_genre_cache: LRUCache = LRUCache(maxsize=100_000)
+        
+        # In-memory state per session (keyed by user_id). Bounded by size and
+        # age so users who never come back don't keep their state forever.
+        # Accessed only from sync methods on the event loop, so no lock needed.
+        self.sessions: TTLCache = TTLCache(
+            maxsize=self.settings.processing_session_max,
+            ttl=self.settings.processing_session_ttl_seconds
+        )
+        
+        # Sessions of running scans and scans parked on a Gemini batch. Kept
+        # out of the TTL cache so they can't expire or be evicted mid-scan.
+        self._active_sessions: Dict[str, ProcessingState] = {}
     
     def get_state(self, user_id: str) -> ProcessingState:
         """Get or create processing state for a user."""
-        if user_id not in self.sessions:
-            self.sessions[user_id] = ProcessingState()
-        return self.sessions[user_id]
+        state = self._active_sessions.get(user_id)
+        if state is None:
+            state = self.sessions.get(user_id)
+        if state is None:
+            state = self.sessions[user_id] = ProcessingState()
+        return state
     
     def clear_state(self, user_id: str):
-        """Clear the processing state for a user."""
-        if user_id in self.sessions:
-            del self.sessions[user_id]
+        """Clear the processing state for a user, unless a scan is still using it."""
+        self.sessions.pop(user_id, None)
+    
+    def _start_session(self, user_id: str) -> ProcessingState:
+        """Pin a user's state while a scan runs."""
+        state = self.get_state(user_id)
+        self.sessions.pop(user_id, None)
+        self._active_sessions[user_id] = state
+        return state
+    
+    def _end_session(self, user_id: str):
+        """Hand a finished scan's state back to the TTL cache; parked scans stay pinned."""
+        state = self._active_sessions.get(user_id)
+        if state is not None and state.status != ProcessingStatus.AWAITING_BATCH:
+            del self._active_sessions[user_id]
+            self.sessions[user_id] = state
+    
+    async def _call_gemini(self, func, *args):
+        """
+        Run a Gemini call under the shared concurrency cap and rate limit, with retries.
+        
+        Every attempt takes its own slot and limiter token, and neither is
+        held while backing off between attempts.
+        """
+        async for attempt in gemini_retrying():
+            with attempt:
+                async with self._gemini_semaphore:
+                    async with self._gemini_limiter:
+                        return await func(*args)
+    
+    async def _get_artist_genres(self, artist_names: List[str]) -> Dict[str, str]:
+        """Look up artist genres in the local LRU first, then in the Firebase cache."""
+        genres: Dict[str, str] = {}
+        misses: List[str] = []
+        for artist in artist_names:
+            genre = self._artist_genre_cache.get(artist)
+            if genre is None:
+                misses.append(artist)
+            else:
+                genres[artist] = genre
+        
+        if misses:
+            firebase_genres = await get_firebase_service().get_cached_artist_genres(misses)
+            self._artist_genre_cache.update(firebase_genres)
+            genres.update(firebase_genres)
+        
+        return genres
+    
+    @staticmethod
+    def _requested_genres(classifications: List, requested: List[str]) -> Dict[str, str]:
+        """
+        Map Gemini's artist classifications back onto the artists that were asked for.
+        
+        Names are matched case-insensitively and returned in the requested
+        spelling. Names Gemini made up or re-spelled are dropped so they never
+        reach the shared genre cache.
+        """
+        by_key = {artist.lower(): artist for artist in requested}
+        genres: Dict[str, str] = {}
+        for classification in classifications:
+            artist = by_key.get(classification.artist_name.strip().lower())
+            if artist is None:
+                logger.warning(f"Ignoring genre for unrequested artist '{classification.artist_name}'")
+                continue
+            genres[artist] = classification.genre
+        return genres
+    
+    async def _save_artist_genres(self, artist_genres: Dict[str, str]):
+        """Store new artist genres in the local LRU and the Firebase cache."""
+        self._artist_genre_cache.update(artist_genres)
+        await get_firebase_service().save_artist_genres(artist_genres)
     
     async def process(self, access_token: str, user_id: str):
         """
@@ -94,12 +192,12 @@ class ProcessingService:
         3. Detect languages using Gemini
         4. Route non-Hindi/English/Instrumental to {Language} playlists
         5. For Hindi/English/Instrumental songs:
-           a. Build artist → songs map
+           a. Collect the unique artists
            b. Check cached artist genres, only call Gemini for new artists
            c. Assign songs to genre playlists based on artist genre
         6. Create and populate playlists
         """
-        state = self.get_state(user_id)
+        state = self._start_session(user_id)
         firebase = get_firebase_service()
         
         try:
@@ -126,11 +224,17 @@ class ProcessingService:
             # Record the timestamp NOW (before fetch) so we don't miss songs
             current_fetch_timestamp = datetime.now(timezone.utc).isoformat()
             
+            # Language detection starts on the first full batch while later
+            # pages are still being fetched. First scans that may go through
+            # Gemini Batch Mode need the whole library before deciding.
+            stream_detection = not (is_first_scan and self._batch_mode_enabled())
+            
             # Fetch songs (incremental if we have a previous timestamp)
-            tracks = await self.spotify.fetch_all_liked_songs(
-                access_token, 
-                max_songs=self.settings.max_liked_songs,
-                since_timestamp=last_fetch_timestamp  # None for first scan = fetch all
+            tracks, cached_tracks, batches, results, cached_genres = await self._fetch_and_detect(
+                state,
+                access_token,
+                since_timestamp=last_fetch_timestamp,  # None for first scan = fetch all
+                detect=stream_detection
             )
             
             # Save the new fetch timestamp
@@ -155,350 +259,840 @@ class ProcessingService:
             # ============================================================
             # Step 2: Language Detection using Gemini
             # ============================================================
-            state.status = ProcessingStatus.DETECTING_LANGUAGES
-            state.message = "Detecting song languages..."
-            state.progress = 0.10
-            
-            # Categorize tracks by language detection
-            language_based_tracks: Dict[str, List[Track]] = defaultdict(list)  # Other languages
-            classifiable_tracks: List[Track] = []  # Hindi, English, Instrumental
-            
-            # Process in batches for language detection
-            batch_size = self.settings.batch_size
-            total_batches = (len(tracks) + batch_size - 1) // batch_size
-            
-            for i in range(0, len(tracks), batch_size):
-                batch = tracks[i:i + batch_size]
-                current_batch = i // batch_size + 1
+            if results is None:
+                tracks_to_detect = [track for batch in batches for track in batch]
                 
-                state.message = f"Detecting languages ({current_batch}/{total_batches})..."
-                state.progress = 0.10 + (0.15 * current_batch / total_batches)
+                # Large first scans can go through Gemini Batch Mode and resume later
+                if self._should_use_batch_mode(tracks_to_detect):
+                    await self._submit_language_batch(state, user_id, tracks_to_detect, batches, cached_tracks)
+                    return
                 
-                try:
-                    result = await self.gemini.detect_languages(batch)
-                    
-                    # Create a lookup for quick access
-                    detection_map = {d.track_id: d for d in result.detections}
-                    
-                    for track in batch:
-                        detection = detection_map.get(track.id)
-                        
-                        if detection:
-                            language = detection.language.lower()
-                            track.detected_language = detection.language
-                            
-                            # Check if instrumental or classifiable language
-                            if detection.is_instrumental:
-                                track.detected_language = "Instrumental"
-                                classifiable_tracks.append(track)
-                            elif language in CLASSIFIABLE_LANGUAGES:
-                                classifiable_tracks.append(track)
-                            else:
-                                # Other languages → {Language} playlist
-                                language_based_tracks[detection.language].append(track)
-                        else:
-                            # Fallback: assume English if detection failed
-                            track.detected_language = "English"
-                            classifiable_tracks.append(track)
-                    
-                except Exception as e:
-                    logger.error(f"Language detection batch failed: {e}")
-                    # Fallback: treat all as English (classifiable)
-                    for track in batch:
-                        track.detected_language = "English"
-                        classifiable_tracks.append(track)
+                # Check the artist genre cache first so each language prompt only
+                # has to classify artists we have never seen before
+                state.message = "Checking artist genre cache..."
+                cached_genres = await self._get_artist_genres(
+                    list({artist for track in tracks for artist in track.normalized_artists})
+                )
+                classify_artists = self._artists_to_classify(batches, cached_genres)
                 
-                # Small delay to avoid rate limits
-                await asyncio.sleep(0.3)
+                results = await self._detect_language_batches(state, batches, classify_artists)
             
-            logger.info(
-                f"Language detection complete: "
-                f"{len(classifiable_tracks)} Hindi/English/Instrumental, "
-                f"{sum(len(t) for t in language_based_tracks.values())} Other languages"
+            await self._save_detected_languages(results)
+            await self._organize(
+                state, access_token, user_id, tracks, batches, results,
+                cached_genres=cached_genres,
+                cached_tracks=cached_tracks
             )
             
-            # ============================================================
-            # Step 3: Build Artist → Songs Map
-            # ============================================================
-            state.status = ProcessingStatus.BUILDING_ARTIST_MAP
-            state.message = "Building artist map..."
-            state.progress = 0.30
-            
-            # artist_name -> list of track objects
-            artist_songs_map: Dict[str, List[Track]] = defaultdict(list)
-            
-            for track in classifiable_tracks:
-                for artist in track.artists:
-                    # Normalize artist name for consistency
-                    artist_normalized = artist.strip()
-                    if artist_normalized:
-                        artist_songs_map[artist_normalized].append(track)
+        except Exception as e:
+            logger.error(f"Processing failed for user {user_id}: {e}")
+            state.status = ProcessingStatus.ERROR
+            state.error = str(e)
+            state.message = "An error occurred during processing."
+            raise
+        finally:
+            self._end_session(user_id)
+    
+    async def resume_from_batch(self, access_token: str, user_id: str) -> bool:
+        """
+        Resume a first scan whose language detection was sent to Gemini Batch Mode.
+        
+        Polls the pending batch job and, once it has finished, continues the
+        pipeline from Step 3. If the job failed it falls back to synchronous
+        detection so the scan still completes.
+        
+        Returns:
+            True if the scan was completed, False if there was nothing to
+            resume or the batch is still running
+        """
+        firebase = get_firebase_service()
+        
+        pending = await firebase.get_pending_language_batch(user_id)
+        if not pending:
+            # Nothing left to resume, so a parked session can go back to the TTL cache
+            state = self._active_sessions.get(user_id)
+            if state is not None and state.status == ProcessingStatus.AWAITING_BATCH:
+                del self._active_sessions[user_id]
+                self.sessions[user_id] = state
+            return False
+        
+        state = self._start_session(user_id)
+        try:
+            tracks_to_detect = [Track(**data) for data in pending['tracks']]
+            cached_tracks = [Track(**data) for data in pending.get('cached_tracks', [])]
+            batch_size = pending['batch_size']
+            batches = [tracks_to_detect[i:i + batch_size] for i in range(0, len(tracks_to_detect), batch_size)]
             
-            all_artists = list(artist_songs_map.keys())
-            logger.info(f"Built artist map with {len(all_artists)} unique artists")
+            try:
+                results = await self.gemini.get_language_batch_results(pending['batch_name'], batches)
+            except Exception as e:
+                logger.error(f"Gemini batch failed for user {user_id[:8]}***, falling back to sync detection: {e}")
+                results = await self._detect_language_batches(state, batches)
             
-            # ============================================================
-            # Step 4: Classify Artists by Genre (with caching)
-            # ============================================================
-            state.status = ProcessingStatus.CLASSIFYING_ARTISTS
-            state.message = "Classifying artists by genre..."
-            state.progress = 0.35
+            if results is None:
+                state.status = ProcessingStatus.AWAITING_BATCH
+                state.message = "Waiting for language detection results..."
+                return False
             
-            # artist_name -> genre
-            artist_genre_map: Dict[str, str] = {}
+            await self._save_detected_languages(results)
             
-            # First, check the cache for known artists
-            state.message = "Checking artist genre cache..."
-            cached_genres = await firebase.get_cached_artist_genres(all_artists)
+            tracks = cached_tracks + tracks_to_detect
+            state.total_songs = len(tracks)
+            await self._organize(
+                state, access_token, user_id, tracks, batches, results,
+                cached_tracks=cached_tracks
+            )
+            await firebase.delete_pending_language_batch(user_id)
+            return True
             
-            # Add cached genres to our map
-            artist_genre_map.update(cached_genres)
+        except Exception as e:
+            logger.error(f"Processing failed for user {user_id}: {e}")
+            state.status = ProcessingStatus.ERROR
+            state.error = str(e)
+            state.message = "An error occurred during processing."
+            raise
+        finally:
+            self._end_session(user_id)
+    
+    def _batch_mode_enabled(self) -> bool:
+        """Check whether Gemini Batch Mode is configured at all."""
+        return self.settings.gemini_batch_mode and bool(self.settings.gemini_api_key)
+    
+    def _should_use_batch_mode(self, tracks: List[Track]) -> bool:
+        """Check whether a first scan is large enough to go through Gemini Batch Mode."""
+        return (
+            self._batch_mode_enabled()
+            and len(tracks) >= self.settings.gemini_batch_min_tracks
+        )
+    
+    async def _fetch_and_detect(
+        self,
+        state: ProcessingState,
+        access_token: str,
+        since_timestamp: Optional[str],
+        detect: bool = True
+    ) -> Tuple[List[Track], List[Track], List[List[Track]], Optional[List], Dict[str, str]]:
+        """
+        Fetch liked songs and detect their languages as a producer/consumer pipeline.
+        
+        A producer task pages through the library into a bounded queue. Each
+        page is checked against the track-language cache, and every time a
+        full batch of uncached tracks is ready a detection task is started,
+        so Gemini works while Spotify pagination is still running.
+        
+        Args:
+            state: Processing state to report progress on
+            access_token: Spotify access token
+            since_timestamp: Only fetch songs added after this ISO timestamp
+            detect: If False, only fetch and batch; detection is left to the caller
+        
+        Returns:
+            Tuple of (tracks, cached_tracks, batches, results, cached_genres).
+            results is None when detect is False.
+        """
+        batch_size = self.settings.batch_size
+        page_queue: asyncio.Queue = asyncio.Queue(maxsize=4)
+        
+        tracks: List[Track] = []
+        cached_tracks: List[Track] = []
+        batches: List[List[Track]] = []
+        detect_tasks: List[asyncio.Task] = []
+        cached_genres: Dict[str, str] = {}
+        seen_artists: Set[str] = set()
+        completed_batches = 0
+        
+        async def produce():
+            pages = self.spotify.iter_liked_song_pages(
+                access_token,
+                max_songs=self.settings.max_liked_songs,
+                since_timestamp=since_timestamp
+            )
+            cancelled = False
+            try:
+                async for page in pages:
+                    await page_queue.put(page)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # Cancels any pages still downloading
+                await pages.aclose()
+                # Sentinel: no more pages. Skipped when cancelled, since the
+                # consumer has stopped reading and a full queue would block
+                if not cancelled:
+                    await page_queue.put(None)
+        
+        def claim_artists(batch: List[Track]) -> List[str]:
+            # Claimed before awaiting so no artist is looked up or
+            # classified twice
+            artists = []
+            for track in batch:
+                for artist in track.normalized_artists:
+                    if artist not in seen_artists:
+                        seen_artists.add(artist)
+                        artists.append(artist)
+            return artists
+        
+        async def detect_batch(batch: List[Track]) -> BatchLanguageResult:
+            nonlocal completed_batches
             
-            # Find artists we need to classify with Gemini
-            uncached_artists = [a for a in all_artists if a not in cached_genres]
+            artists = claim_artists(batch)
             
-            if uncached_artists:
-                logger.info(f"Cache hit: {len(cached_genres)}, need to classify: {len(uncached_artists)}")
+            try:
+                # The genre cache is optional: if it can't be read, classify
+                # every artist rather than lose the batch's language detection
+                try:
+                    genres = await self._get_artist_genres(artists)
+                except Exception as e:
+                    logger.warning(f"Artist genre cache lookup failed, classifying all artists: {e}")
+                    genres = {}
+                cached_genres.update(genres)
+                classify_artists = [a for a in artists if a not in genres]
+                return await self._call_gemini(self.gemini.detect_languages, batch, classify_artists)
+            finally:
+                completed_batches += 1
+                state.message = f"Detecting languages ({completed_batches}/{len(detect_tasks)})..."
+                state.progress = max(state.progress, 0.10 + (0.15 * completed_batches / len(detect_tasks)))
+        
+        def add_batch(batch: List[Track]):
+            batches.append(batch)
+            if detect:
+                state.status = ProcessingStatus.DETECTING_LANGUAGES
+                detect_tasks.append(asyncio.create_task(detect_batch(batch)))
+        
+        producer = asyncio.create_task(produce())
+        pending: List[Track] = []
+        
+        try:
+            while True:
+                page = await page_queue.get()
+                if page is None:
+                    break
                 
-                # New genres to save to cache after processing
-                new_artist_genres: Dict[str, str] = {}
+                tracks.extend(page)
+                state.message = f"Fetched {len(tracks)} songs..."
                 
-                # Process uncached artists in batches
-                artist_batch_size = 30
-                total_artist_batches = (len(uncached_artists) + artist_batch_size - 1) // artist_batch_size
+                # Tracks detected in an earlier scan (by any user) skip Gemini
+                page_cached, page_to_detect = await self._split_cached_languages(page)
+                cached_tracks.extend(page_cached)
+                pending.extend(page_to_detect)
                 
-                for i in range(0, len(uncached_artists), artist_batch_size):
-                    artist_batch = uncached_artists[i:i + artist_batch_size]
-                    current_batch = i // artist_batch_size + 1
-                    
-                    state.message = f"Classifying new artists ({current_batch}/{total_artist_batches})..."
-                    state.progress = 0.35 + (0.20 * current_batch / total_artist_batches)
-                    
-                    try:
-                        result = await self.gemini.classify_artists(artist_batch)
-                        
-                        for classification in result.classifications:
-                            artist_genre_map[classification.artist_name] = classification.genre
-                            new_artist_genres[classification.artist_name] = classification.genre
-                        
-                        # Handle failed artists - default to Pop
-                        for failed_artist in result.failed_artists:
-                            artist_genre_map[failed_artist] = "Pop"
-                            new_artist_genres[failed_artist] = "Pop"
-                            logger.warning(f"Artist '{failed_artist}' defaulted to Pop")
-                        
-                    except Exception as e:
-                        logger.error(f"Artist classification batch failed: {e}")
-                        # Fallback: assign Pop to all artists in this batch
-                        for artist in artist_batch:
-                            if artist not in artist_genre_map:
-                                artist_genre_map[artist] = "Pop"
-                                new_artist_genres[artist] = "Pop"
-                    
-                    # Small delay to avoid rate limits
-                    await asyncio.sleep(0.5)
+                # Language-cached tracks skip detection, so look their artists
+                # up here; any the cache misses are classified in Step 4
+                if detect:
+                    artists = claim_artists(page_cached)
+                    if artists:
+                        cached_genres.update(await self._get_artist_genres(artists))
                 
-                # Save new classifications to cache
-                if new_artist_genres:
-                    await firebase.save_artist_genres(new_artist_genres)
-                    logger.info(f"Saved {len(new_artist_genres)} new artist genres to cache")
+                while len(pending) >= batch_size:
+                    add_batch(pending[:batch_size])
+                    pending = pending[batch_size:]
+            
+            if pending:
+                add_batch(pending)
+            
+            # Re-raise any error from the fetch
+            await producer
+        except BaseException:
+            producer.cancel()
+            for task in detect_tasks:
+                task.cancel()
+            # Let them unwind before propagating; their own errors are secondary
+            await asyncio.gather(producer, *detect_tasks, return_exceptions=True)
+            raise
+        
+        if not detect:
+            return tracks, cached_tracks, batches, None, cached_genres
+        
+        results = await asyncio.gather(*detect_tasks, return_exceptions=True)
+        return tracks, cached_tracks, batches, results, cached_genres
+    
+    async def _submit_language_batch(
+        self,
+        state: ProcessingState,
+        user_id: str,
+        tracks: List[Track],
+        batches: List[List[Track]],
+        cached_tracks: List[Track]
+    ):
+        """Submit language detection as a Gemini batch job and park the scan."""
+        firebase = get_firebase_service()
+        
+        state.message = "Submitting songs for language detection..."
+        batch_name = await self.gemini.submit_language_batch(batches)
+        
+        saved = await firebase.save_pending_language_batch(
+            user_id,
+            batch_name,
+            tracks=[track.model_dump() for track in tracks],
+            batch_size=self.settings.batch_size,
+            cached_tracks=[track.model_dump() for track in cached_tracks]
+        )
+        if not saved:
+            raise Exception("Failed to persist pending Gemini batch")
+        
+        state.status = ProcessingStatus.AWAITING_BATCH
+        state.message = "Your library is queued for organizing. This can take a few hours."
+        state.progress = 0.10
+        logger.info(f"First scan for user {user_id[:8]}*** parked on Gemini batch {batch_name}")
+    
+    async def _split_cached_languages(self, tracks: List[Track]) -> Tuple[List[Track], List[Track]]:
+        """
+        Split tracks into those with a cached language and those still to detect.
+        
+        Cache hits get ``detected_language`` set so they can be routed
+        without calling Gemini.
+        
+        Returns:
+            Tuple of (cached_tracks, tracks_to_detect)
+        """
+        firebase = get_firebase_service()
+        cached_languages = await firebase.get_cached_track_languages([track.id for track in tracks])
+        
+        cached_tracks: List[Track] = []
+        tracks_to_detect: List[Track] = []
+        
+        for track in tracks:
+            cached = cached_languages.get(track.id)
+            if cached:
+                track.detected_language = "Instrumental" if cached['is_instrumental'] else cached['language']
+                cached_tracks.append(track)
+            else:
+                tracks_to_detect.append(track)
+        
+        return cached_tracks, tracks_to_detect
+    
+    async def _save_detected_languages(self, results: List):
+        """Cache Gemini's language detections; heuristic fallbacks are not cached."""
+        new_languages = {}
+        for result in results:
+            if isinstance(result, BaseException) or result.is_fallback:
+                continue
+            for detection in result.detections:
+                new_languages[detection.track_id] = {
+                    'language': detection.language,
+                    'is_instrumental': detection.is_instrumental
+                }
+        
+        if not new_languages:
+            return
+        
+        try:
+            await get_firebase_service().save_track_languages(new_languages)
+        except Exception as e:
+            # The cache is an optimization; never fail the scan over it
+            logger.warning(f"Failed to cache track languages: {e}")
+    
+    def _artists_to_classify(
+        self,
+        batches: List[List[Track]],
+        cached_genres: Dict[str, str]
+    ) -> List[List[str]]:
+        """
+        Pick the uncached artists each language batch should also classify.
+        
+        Every uncached artist is assigned to the first batch it appears in,
+        so no artist is classified twice.
+        """
+        seen = set(cached_genres)
+        batch_artists = []
+        
+        for batch in batches:
+            artists = []
+            for track in batch:
+                for artist_normalized in track.normalized_artists:
+                    if artist_normalized not in seen:
+                        seen.add(artist_normalized)
+                        artists.append(artist_normalized)
+            batch_artists.append(artists)
+        
+        return batch_artists
+    
+    async def _detect_language_batches(
+        self,
+        state: ProcessingState,
+        batches: List[List[Track]],
+        classify_artists: Optional[List[List[str]]] = None
+    ) -> List:
+        """
+        Detect languages for all batches concurrently under the shared Gemini limits.
+        
+        Args:
+            state: Processing state to report progress on
+            batches: Track batches to detect languages for
+            classify_artists: Optional uncached artists per batch to classify
+                by genre in the same Gemini call
+        
+        Returns:
+            One BatchLanguageResult (or the raised exception) per batch, in order
+        """
+        state.status = ProcessingStatus.DETECTING_LANGUAGES
+        state.message = "Detecting song languages..."
+        state.progress = 0.10
+        
+        total_batches = len(batches)
+        completed_batches = 0
+        
+        async def detect_batch(batch: List[Track], artists: List[str]) -> BatchLanguageResult:
+            nonlocal completed_batches
+            try:
+                return await self._call_gemini(self.gemini.detect_languages, batch, artists)
+            finally:
+                completed_batches += 1
+                state.message = f"Detecting languages ({completed_batches}/{total_batches})..."
+                state.progress = 0.10 + (0.15 * completed_batches / total_batches)
+        
+        if classify_artists is None:
+            classify_artists = [[] for _ in batches]
+        
+        return await asyncio.gather(
+            *(detect_batch(batch, artists) for batch, artists in zip(batches, classify_artists)),
+            return_exceptions=True
+        )
+    
+    async def _organize(
+        self,
+        state: ProcessingState,
+        access_token: str,
+        user_id: str,
+        tracks: List[Track],
+        batches: List[List[Track]],
+        results: List,
+        cached_genres: Optional[Dict[str, str]] = None,
+        cached_tracks: Optional[List[Track]] = None
+    ):
+        """
+        Route detected languages and run Steps 3-8 of the pipeline.
+        
+        Shared by the synchronous path and by scans resumed from Gemini Batch Mode.
+        ``cached_genres`` is the artist cache lookup already done before
+        language detection, if any; otherwise Step 4 looks the cache up itself.
+        ``cached_tracks`` already carry a language from the track-language cache.
+        """
+        # Categorize tracks by language detection
+        language_based_tracks: Dict[str, List[Track]] = defaultdict(list)  # Other languages
+        classifiable_tracks: List[Track] = []  # Hindi, English, Instrumental
+        
+        # Cached tracks come first, in the order they were fetched
+        for track in cached_tracks or []:
+            if track.detected_language in CLASSIFIABLE_LANGUAGES:
+                classifiable_tracks.append(track)
             else:
-                logger.info(f"All {len(all_artists)} artists found in cache - no Gemini calls needed!")
-                state.progress = 0.55
+                language_based_tracks[track.detected_language].append(track)
+        
+        # Fold results in batch order so playlist contents stay deterministic
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Language detection batch failed: {result}")
+                # Fallback: treat all as English (classifiable)
+                for track in batch:
+                    track.detected_language = "English"
+                    classifiable_tracks.append(track)
+                continue
             
-            logger.info(f"Classified {len(artist_genre_map)} artists into genres")
+            # Create a lookup for quick access
+            detection_map = {d.track_id: d for d in result.detections}
             
-            # ============================================================
-            # Step 5: Assign Songs to Playlists
-            # ============================================================
-            state.message = "Organizing songs into playlists..."
-            state.progress = 0.58
+            for track in batch:
+                detection = detection_map.get(track.id)
+                
+                if detection:
+                    language = detection.language
+                    track.detected_language = language
+                    
+                    # Check if instrumental or classifiable language
+                    if detection.is_instrumental:
+                        track.detected_language = "Instrumental"
+                        classifiable_tracks.append(track)
+                    elif language in CLASSIFIABLE_LANGUAGES:
+                        classifiable_tracks.append(track)
+                    else:
+                        # Other languages → {Language} playlist
+                        language_based_tracks[detection.language].append(track)
+                else:
+                    # Fallback: assume English if detection failed
+                    track.detected_language = "English"
+                    classifiable_tracks.append(track)
+        
+        logger.info(
+            f"Language detection complete: "
+            f"{len(classifiable_tracks)} Hindi/English/Instrumental, "
+            f"{sum(len(t) for t in language_based_tracks.values())} Other languages"
+        )
+        
+        # ============================================================
+        # Step 3: Collect Unique Artists
+        # ============================================================
+        state.status = ProcessingStatus.BUILDING_ARTIST_MAP
+        state.message = "Building artist map..."
+        state.progress = 0.30
+        
+        # Only the artist names are needed; Step 5 walks classifiable_tracks
+        # directly. dict.fromkeys dedupes while keeping first-seen order.
+        # Names are stripped and interned once per track.
+        all_artists = list(dict.fromkeys(
+            artist for track in classifiable_tracks for artist in track.normalized_artists
+        ))
+        logger.info(f"Built artist map with {len(all_artists)} unique artists")
+        
+        # ============================================================
+        # Step 4: Classify Artists by Genre (with caching)
+        # ============================================================
+        state.status = ProcessingStatus.CLASSIFYING_ARTISTS
+        state.message = "Classifying artists by genre..."
+        state.progress = 0.35
+        
+        # artist_name -> genre
+        artist_genre_map: Dict[str, str] = {}
+        
+        # New genres to save to cache after processing
+        new_artist_genres: Dict[str, str] = {}
+        
+        # First, check the cache for known artists (nothing to look up if
+        # there are no classifiable tracks)
+        if cached_genres is None and all_artists:
+            state.message = "Checking artist genre cache..."
+            cached_genres = await self._get_artist_genres(all_artists)
+        
+        # Add cached genres to our map
+        artist_genre_map.update(cached_genres or {})
+        
+        # Add genres classified alongside language detection. Each prompt only
+        # asked about artists of its own batch.
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException) or not result.artist_genres:
+                continue
+            batch_artists = [artist for track in batch for artist in track.normalized_artists]
+            genres = self._requested_genres(result.artist_genres, batch_artists)
+            artist_genre_map.update(genres)
+            new_artist_genres.update(genres)
+        
+        # Find artists we still need to classify with Gemini
+        uncached_artists = [a for a in all_artists if a not in artist_genre_map]
+        
+        if uncached_artists:
+            logger.info(f"Cache hit: {len(artist_genre_map)}, need to classify: {len(uncached_artists)}")
             
-            # Final playlist assignments: playlist_name -> list of track_ids
-            playlist_assignments: Dict[str, Set[str]] = defaultdict(set)
+            # Classify uncached artist batches concurrently under the Gemini limits
+            artist_batch_size = 30
+            artist_batches = [
+                uncached_artists[i:i + artist_batch_size]
+                for i in range(0, len(uncached_artists), artist_batch_size)
+            ]
+            total_artist_batches = len(artist_batches)
             
-            # 5a. Add language-based tracks (non Hindi/English/Instrumental)
-            for language, tracks_list in language_based_tracks.items():
-                # Use language name as playlist name
-                playlist_name = language.title()
-                for track in tracks_list:
-                    playlist_assignments[playlist_name].add(track.id)
-                logger.info(f"Assigned {len(tracks_list)} tracks to language: {playlist_name}")
+            async def classify_batch(artist_batch: List[str]):
+                try:
+                    result = await self._call_gemini(self.gemini.classify_artists, artist_batch)
+                    return artist_batch, result, None
+                except Exception as e:
+                    return artist_batch, None, e
             
-            # 5b. Assign classifiable tracks based on artist genre
-            for track in classifiable_tracks:
-                # For tracks with multiple artists, we add to all artist genres
-                # But if genres match, it's only added once (using set)
-                assigned_genres = set()
+            # as_completed lets progress advance as each batch finishes
+            completed_batches = 0
+            for next_done in asyncio.as_completed(
+                [classify_batch(batch) for batch in artist_batches]
+            ):
+                artist_batch, result, error = await next_done
+                completed_batches += 1
                 
-                for artist in track.artists:
-                    artist_normalized = artist.strip()
-                    if artist_normalized in artist_genre_map:
-                        genre = artist_genre_map[artist_normalized]
-                        assigned_genres.add(genre)
+                state.message = f"Classifying new artists ({completed_batches}/{total_artist_batches})..."
+                state.progress = 0.35 + (0.20 * completed_batches / total_artist_batches)
                 
-                # If no genres found (shouldn't happen), default to Pop
-                if not assigned_genres:
-                    assigned_genres.add("Pop")
+                if error is not None:
+                    logger.error(f"Artist classification batch failed: {error}")
+                    # Fallback: assign Pop to all artists in this batch
+                    for artist in artist_batch:
+                        if artist not in artist_genre_map:
+                            artist_genre_map[artist] = "Pop"
+                            new_artist_genres[artist] = "Pop"
+                    continue
                 
-                # Add track to each assigned genre playlist
-                for genre in assigned_genres:
-                    playlist_assignments[genre].add(track.id)
-            
-            # Convert sets to lists
-            playlist_assignments_final: Dict[str, List[str]] = {
-                name: list(ids) for name, ids in playlist_assignments.items() if ids
-            }
-            
-            state.processed_songs = len(tracks)
-            
-            # Log genre distribution
-            for playlist_name, track_ids in playlist_assignments_final.items():
-                logger.info(f"Playlist '{playlist_name}': {len(track_ids)} tracks")
-            
-            # ============================================================
-            # Step 6: Create/Reuse playlists
-            # ============================================================
-            state.status = ProcessingStatus.CREATING_PLAYLISTS
-            state.message = "Checking existing playlists..."
-            state.progress = 0.60
-            # Get user info for playlist creation
-            user_info = await self.spotify.get_current_user(access_token)
-            spotify_user_id = user_info.get("id")
-            logger.debug(f"Current user's Spotify ID: {spotify_user_id}")
-            
-            # OPTIMIZATION: Fetch all user playlists ONCE to avoid repeated searches
-            # This prevents creating duplicates if the playlist already exists
-            all_user_playlists = await self.spotify.get_user_playlists(access_token)
-            logger.debug(f"Total playlists in user's library: {len(all_user_playlists)}")
+                genres = self._requested_genres(result.classifications, artist_batch)
+                artist_genre_map.update(genres)
+                new_artist_genres.update(genres)
+                
+                # Handle failed artists - default to Pop
+                for failed_artist in result.failed_artists:
+                    artist_genre_map[failed_artist] = "Pop"
+                    new_artist_genres[failed_artist] = "Pop"
+                    logger.warning(f"Artist '{failed_artist}' defaulted to Pop")
+        else:
+            logger.info(f"All {len(all_artists)} artists already classified - no extra Gemini calls needed!")
+        
+        # Save new classifications to cache
+        if new_artist_genres:
+            await self._save_artist_genres(new_artist_genres)
+            logger.info(f"Saved {len(new_artist_genres)} new artist genres to cache")
+        
+        state.progress = 0.55
+        
+        logger.info(f"Classified {len(artist_genre_map)} artists into genres")
+        
+        # ============================================================
+        # Step 5: Assign Songs to Playlists
+        # ============================================================
+        state.message = "Organizing songs into playlists..."
+        state.progress = 0.58
+        
+        # Final playlist assignments: playlist_name -> list of track_ids
+        playlist_assignments: Dict[str, Set[str]] = defaultdict(set)
+        
+        # 5a. Add language-based tracks (non Hindi/English/Instrumental)
+        for language, tracks_list in language_based_tracks.items():
+            # Use language name as playlist name
+            playlist_name = language.title()
+            playlist_assignments[playlist_name].update(track.id for track in tracks_list)
+            logger.info(f"Assigned {len(tracks_list)} tracks to language: {playlist_name}")
+        
+        # 5b. Assign classifiable tracks based on artist genre
+        artist_to_genre = artist_genre_map.get
+        for track in classifiable_tracks:
+            # For tracks with multiple artists, we add to all artist genres
+            # But if genres match, it's only added once (using set)
+            # If no genres found (shouldn't happen), default to Pop
+            assigned_genres = (
+                {artist_to_genre(artist, None) for artist in track.normalized_artists} - {None}
+            ) or {"Pop"}
             
-            # Debug: Log all playlists with their owners
-            for p in all_user_playlists:  # First 10 for debugging
+            # Add track to each assigned genre playlist
+            for genre in assigned_genres:
+                playlist_assignments[genre].add(track.id)
+        
+        # Convert sets to lists in place so both copies are never held at once
+        playlist_assignments_final: Dict[str, List[str]] = {}
+        for name in list(playlist_assignments):
+            ids = playlist_assignments.pop(name)
+            if ids:
+                playlist_assignments_final[name] = list(ids)
+        del playlist_assignments
+        
+        state.processed_songs = len(tracks)
+        
+        # Log genre distribution
+        for playlist_name, track_ids in playlist_assignments_final.items():
+            logger.info(f"Playlist '{playlist_name}': {len(track_ids)} tracks")
+        
+        # ============================================================
+        # Step 6: Create/Reuse playlists
+        # ============================================================
+        state.status = ProcessingStatus.CREATING_PLAYLISTS
+        state.message = "Checking existing playlists..."
+        state.progress = 0.60
+        # Get user info for playlist creation
+        user_info = await self.spotify.get_current_user(access_token)
+        spotify_user_id = user_info.get("id")
+        logger.debug("Current user's Spotify ID: %s", spotify_user_id)
+        
+        # OPTIMIZATION: Fetch all user playlists ONCE to avoid repeated searches
+        # This prevents creating duplicates if the playlist already exists.
+        # Bypass the listing cache: Step 8 trusts these track totals.
+        all_user_playlists = await self.spotify.get_user_playlists(
+            access_token, use_cache=False
+        )
+        logger.debug("Total playlists in user's library: %d", len(all_user_playlists))
+        
+        # Debug: Log all playlists with their owners (skipped entirely unless DEBUG is on)
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            for p in all_user_playlists:
                 owner_id = p.get('owner', {}).get('id', 'UNKNOWN')
-                logger.debug(f"  Playlist: '{p.get('name')}' | Owner: {owner_id} | Match: {owner_id == spotify_user_id}")
-
-            # Map existing playlists by name (only if owned by current user)
-            # Use lowercase keys for case-insensitive matching
-            existing_playlists_map = {
-                p['name'].lower(): p for p in all_user_playlists 
-                if p.get('owner', {}).get('id') == spotify_user_id
-            }
-            logger.info(f"Loaded {len(existing_playlists_map)} OWNED playlists for user (out of {len(all_user_playlists)} total)")
-            
+                logger.debug(
+                    "  Playlist: '%s' | Owner: %s | Match: %s",
+                    p.get('name'), owner_id, owner_id == spotify_user_id
+                )
+        
+        # Map existing playlists by name (only if owned by current user)
+        # Use lowercase keys for case-insensitive matching
+        existing_playlists_map = {
+            p['name'].lower(): p for p in all_user_playlists 
+            if p.get('owner', {}).get('id') == spotify_user_id
+        }
+        logger.info(f"Loaded {len(existing_playlists_map)} OWNED playlists for user (out of {len(all_user_playlists)} total)")
+        
+        # Track totals come with the playlist objects, so Step 8 needs no
+        # extra requests. None means unknown and is checked against the API.
+        track_total_by_id: Dict[str, Optional[int]] = {
+            p['id']: (p.get('tracks') or {}).get('total') for p in all_user_playlists
+        }
+        
+        if debug_enabled:
             # Debug: Log all existing playlist names for troubleshooting
             if existing_playlists_map:
-                logger.debug(f"Existing playlist names (lowercase): {list(existing_playlists_map.keys())}")
+                logger.debug("Existing playlist names (lowercase): %s", list(existing_playlists_map))
             
             # Debug: Log target playlist names we're looking for
-            logger.debug(f"Target playlist names: {list(playlist_assignments_final.keys())}")
-            
-            playlist_mapping: Dict[str, str] = {}  # playlist name -> playlist id
-            total_playlists = len(playlist_assignments_final)
-            created_count = 0
-            
-            state.message = "Preparing playlists..."
-
-            for playlist_name in playlist_assignments_final.keys():
-                try:
-                    # Check if playlist already exists in our pre-fetched map (case-insensitive)
-                    playlist_name_lower = playlist_name.lower()
-                    if playlist_name_lower in existing_playlists_map:
-                        playlist = existing_playlists_map[playlist_name_lower]
-                        logger.info(f"Reusing existing playlist: {playlist.get('name')} ({playlist.get('id')})")
-                    else:
-                        # Create new playlist
-                        logger.info(f"Creating new playlist: {playlist_name}")
-                        playlist = await self.spotify.create_playlist(
-                            access_token,
-                            spotify_user_id,
-                            playlist_name,
-                            description=f"Auto-organized by Spotify Housekeeping",
-                            public=True, 
-                        )
-                        # Add to map so we don't create it again if referenced twice (unlikely but safe)
-                        existing_playlists_map[playlist_name_lower] = playlist
-                        
-                    playlist_id = playlist.get("id")
-                    playlist_mapping[playlist_name] = playlist_id
-                    
-                    if playlist_id not in state.created_playlist_ids:
-                        state.created_playlist_ids.append(playlist_id)
-                        state.playlists_created += 1
-                    
-                    created_count += 1
-                    state.progress = 0.60 + (0.15 * created_count / max(total_playlists, 1))
-                    state.message = f"Preparing playlist: {playlist_name}"
+            logger.debug("Target playlist names: %s", list(playlist_assignments_final))
+        
+        playlist_mapping: Dict[str, str] = {}  # playlist name -> playlist id
+        existing_track_ids: Dict[str, Set[str]] = {}  # playlist id -> tracks already in it
+        new_playlist_ids: Set[str] = set()  # created this run, so start out empty
+        total_playlists = len(playlist_assignments_final)
+        created_count = 0
+        
+        state.message = "Preparing playlists..."
+        
+        async def ensure_playlist(playlist_name: str):
+            nonlocal created_count
+            try:
+                # Check if playlist already exists in our pre-fetched map (case-insensitive)
+                playlist_name_lower = playlist_name.lower()
+                if playlist_name_lower in existing_playlists_map:
+                    playlist = existing_playlists_map[playlist_name_lower]
+                    logger.info(f"Reusing existing playlist: {playlist.get('name')} ({playlist.get('id')})")
                     
-                except Exception as e:
-                    logger.error(f"Failed to get/create playlist {playlist_name}: {e}")
-                
-                # Small delay between operations
-                await asyncio.sleep(0.1)
-            
-            # ============================================================
-            # Step 7: Populate playlists
-            # ============================================================
-            state.status = ProcessingStatus.POPULATING_PLAYLISTS
-            state.message = "Adding songs to playlists..."
-            state.progress = 0.75
-            
-            playlists_populated = 0
-            
-            for playlist_name, playlist_id in playlist_mapping.items():
-                track_ids = playlist_assignments_final[playlist_name]
-                track_uris = [f"spotify:track:{tid}" for tid in track_ids]
-                
-                try:
-                    await self.spotify.add_tracks_to_playlist(
+                    # Load what's already there so Step 7 only sends new tracks
+                    if (playlist.get('tracks') or {}).get('total') != 0:
+                        try:
+                            existing_track_ids[playlist['id']] = set(await self.spotify.get_playlist_track_ids(
+                                access_token,
+                                playlist['id']
+                            ))
+                        except Exception as e:
+                            logger.warning(f"Could not load tracks of {playlist_name}, adding all: {e}")
+                else:
+                    # Create new playlist
+                    logger.info(f"Creating new playlist: {playlist_name}")
+                    playlist = await self.spotify.create_playlist(
                         access_token,
-                        playlist_id,
-                        track_uris
+                        spotify_user_id,
+                        playlist_name,
+                        description=f"Auto-organized by Spotify Housekeeping",
+                        public=True, 
                     )
+                    # Add to map so we don't create it again if referenced twice (unlikely but safe)
+                    existing_playlists_map[playlist_name_lower] = playlist
+                    new_playlist_ids.add(playlist.get("id"))
                     
-                    playlists_populated += 1
-                    state.progress = 0.75 + (0.15 * playlists_populated / max(len(playlist_mapping), 1))
-                    state.message = f"Added {len(track_ids)} songs to {playlist_name}..."
-                    
-                    logger.info(f"Added {len(track_ids)} tracks to {playlist_name}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to populate playlist {playlist_name}: {e}")
-            
-            # ============================================================
-            # Step 8: Cleanup empty playlists
-            # ============================================================
-            state.status = ProcessingStatus.CLEANING_UP
-            state.message = "Cleaning up empty playlists..."
-            state.progress = 0.92
-            
-            for playlist_id in state.created_playlist_ids:
-                try:
-                    count = await self.spotify.get_playlist_track_count(access_token, playlist_id)
-                    if count == 0:
-                        await self.spotify.delete_playlist(access_token, playlist_id)
-                        state.playlists_created -= 1
-                        logger.info(f"Deleted empty playlist: {playlist_id}")
-                except Exception as e:
-                    logger.warning(f"Failed to cleanup playlist {playlist_id}: {e}")
-            
-            # ============================================================
-            # Complete!
-            # ============================================================
-            state.status = ProcessingStatus.COMPLETED
-            state.message = "Housekeeping done!"
-            state.progress = 1.0
+                playlist_id = playlist.get("id")
+                playlist_mapping[playlist_name] = playlist_id
+                if playlist_id not in track_total_by_id:
+                    # New playlists start out empty
+                    track_total_by_id[playlist_id] = (playlist.get('tracks') or {}).get('total', 0)
+                
+                if playlist_id not in state.created_playlist_ids:
+                    state.created_playlist_ids.append(playlist_id)
+                    state.playlists_created += 1
+                
+                created_count += 1
+                state.progress = 0.60 + (0.15 * created_count / max(total_playlists, 1))
+                state.message = f"Preparing playlist: {playlist_name}"
+                
+            except Exception as e:
+                logger.error(f"Failed to get/create playlist {playlist_name}: {e}")
+        
+        # Counters are only touched between awaits, so no lock is needed
+        await asyncio.gather(*(ensure_playlist(name) for name in playlist_assignments_final))
+        
+        # ============================================================
+        # Step 7: Populate playlists
+        # ============================================================
+        state.status = ProcessingStatus.POPULATING_PLAYLISTS
+        state.message = "Adding songs to playlists..."
+        state.progress = 0.75
+        
+        playlists_populated = 0
+        
+        async def populate_playlist(playlist_name: str, playlist_id: str):
+            nonlocal playlists_populated
+            already_added = existing_track_ids.get(playlist_id, ())
+            track_ids = [tid for tid in playlist_assignments_final[playlist_name] if tid not in already_added]
+            track_uris = [f"spotify:track:{tid}" for tid in track_ids]
             
-            logger.info(
-                f"Processing completed for user {user_id}. "
-                f"Processed {state.processed_songs} songs into {state.playlists_created} playlists."
-            )
+            if not track_uris:
+                playlists_populated += 1
+                logger.info(f"All tracks already in {playlist_name}, nothing to add")
+                return
             
-        except Exception as e:
-            logger.error(f"Processing failed for user {user_id}: {e}")
-            state.status = ProcessingStatus.ERROR
-            state.error = str(e)
-            state.message = "An error occurred during processing."
-            raise
+            try:
+                # A new playlist has nothing to stay in order with, so its
+                # batches can be sent concurrently
+                added = await self.spotify.add_tracks_to_playlist(
+                    access_token,
+                    playlist_id,
+                    track_uris,
+                    preserve_order=playlist_id not in new_playlist_ids
+                )
+                
+                current_total = track_total_by_id.get(playlist_id)
+                if added and current_total is not None:
+                    track_total_by_id[playlist_id] = current_total + len(track_uris)
+                else:
+                    # Some batches may have landed; let cleanup ask Spotify
+                    track_total_by_id[playlist_id] = None
+                
+                playlists_populated += 1
+                state.progress = 0.75 + (0.15 * playlists_populated / max(len(playlist_mapping), 1))
+                state.message = f"Added {len(track_ids)} songs to {playlist_name}..."
+                
+                logger.info(f"Added {len(track_ids)} tracks to {playlist_name}")
+                
+            except Exception as e:
+                track_total_by_id[playlist_id] = None
+                logger.error(f"Failed to populate playlist {playlist_name}: {e}")
+        
+        await asyncio.gather(*(
+            populate_playlist(playlist_name, playlist_id)
+            for playlist_name, playlist_id in playlist_mapping.items()
+        ))
+        
+        # ============================================================
+        # Step 8: Cleanup empty playlists
+        # ============================================================
+        state.status = ProcessingStatus.CLEANING_UP
+        state.message = "Cleaning up empty playlists..."
+        state.progress = 0.92
+        
+        # Only playlists whose total is unknown need a track count request
+        unknown_playlist_ids = [
+            playlist_id for playlist_id in state.created_playlist_ids
+            if track_total_by_id.get(playlist_id) is None
+        ]
+        track_counts = await asyncio.gather(
+            *(
+                self.spotify.get_playlist_track_count(access_token, playlist_id)
+                for playlist_id in unknown_playlist_ids
+            ),
+            return_exceptions=True
+        )
+        
+        for playlist_id, count in zip(unknown_playlist_ids, track_counts):
+            if isinstance(count, BaseException):
+                logger.warning(f"Failed to cleanup playlist {playlist_id}: {count}")
+            else:
+                track_total_by_id[playlist_id] = count
+        
+        empty_playlist_ids = [
+            playlist_id for playlist_id in state.created_playlist_ids
+            if track_total_by_id.get(playlist_id) == 0
+        ]
+        
+        delete_results = await asyncio.gather(
+            *(
+                self.spotify.delete_playlist(access_token, playlist_id)
+                for playlist_id in empty_playlist_ids
+            ),
+            return_exceptions=True
+        )
+        
+        for playlist_id, result in zip(empty_playlist_ids, delete_results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Failed to cleanup playlist {playlist_id}: {result}")
+            else:
+                state.playlists_created -= 1
+                logger.info(f"Deleted empty playlist: {playlist_id}")
+        
+        # ============================================================
+        # Complete!
+        # ============================================================
+        state.status = ProcessingStatus.COMPLETED
+        state.message = "Housekeeping done!"
+        state.progress = 1.0
+        
+        logger.info(
+            f"Processing completed for user {user_id}. "
+            f"Processed {state.processed_songs} songs into {state.playlists_created} playlists."
+        )
     
     async def close(self):
         """Cleanup resources."""
@@ -13,14 +13,20 @@ Features:
 
 import asyncio
 import logging
+import random
+import time
 from collections import deque
-from datetime import datetime, timezone
 from typing import Optional, Dict
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
 
+# Backoff after 429s: exponential from BACKOFF_BASE seconds, capped at MAX_BACKOFF
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 60.0
+
+
 class EndpointType(Enum):
     """Types of Spotify API endpoints with different rate limit priorities."""
     READ = "read"           # GET requests (higher limit)
@@ -36,17 +42,7 @@ class SpotifyRateLimiter:
     within Spotify's rate limits across all concurrent operations.
     """
     
-    _instance: Optional['SpotifyRateLimiter'] = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
     def __init__(self):
-        if hasattr(self, '_initialized') and self._initialized:
-            return
-        
         # Configuration - conservative limits to stay safe
         # Spotify doesn't publish exact limits, so we use conservative values
         self.window_seconds = 30
@@ -58,15 +54,15 @@ class SpotifyRateLimiter:
             EndpointType.BATCH: 20,   # 20 batch requests per 30 seconds
         }
         
-        # Track call times per endpoint type
-        self.call_times: Dict[EndpointType, deque] = {
-            endpoint_type: deque() for endpoint_type in EndpointType
-        }
+        # Track call times per endpoint type, created on first use. Bounded at
+        # twice the limit: only the limit most recent calls matter
+        self.call_times: Dict[EndpointType, deque] = {}
         
-        # Lock for thread safety
-        self._locks: Dict[EndpointType, asyncio.Lock] = {
-            endpoint_type: asyncio.Lock() for endpoint_type in EndpointType
-        }
+        # Per-endpoint locks, created when an endpoint first has to wait
+        self._locks: Dict[EndpointType, asyncio.Lock] = {}
+        
+        # Callers on the slow path per endpoint, waiting or holding the lock
+        self._waiting: Dict[EndpointType, int] = {}
         
         # Global lock for cross-type operations
         self._global_lock = asyncio.Lock()
@@ -75,9 +71,59 @@ class SpotifyRateLimiter:
         self._consecutive_429s = 0
         self._backoff_multiplier = 1.0
         
-        self._initialized = True
+        # Limits scaled by the backoff multiplier, recomputed only when it changes
+        self._effective_limits: Dict[EndpointType, int] = dict(self.limits)
+        
         logger.info("Spotify rate limiter initialized")
     
+    def _set_backoff_multiplier(self, multiplier: float) -> None:
+        """Update the backoff multiplier and the effective limits derived from it."""
+        self._backoff_multiplier = multiplier
+        for endpoint_type, limit in self.limits.items():
+            self._effective_limits[endpoint_type] = int(limit / multiplier)
+    
+    def _try_acquire(self, endpoint_type: EndpointType) -> float:
+        """
+        Admit a call if the window has room, in a single synchronous step.
+        
+        There is no await between the check and the record, so on the event
+        loop this is atomic without a lock or a compare-and-swap.
+        
+        Returns:
+            0.0 if the call was admitted and recorded, otherwise the number
+            of seconds until the oldest call leaves the window
+        """
+        # Monotonic clock: cheap, allocation-free and immune to wall-clock jumps
+        now = time.monotonic()
+        call_times = self.call_times.get(endpoint_type)
+        if call_times is None:
+            call_times = self.call_times[endpoint_type] = deque(
+                maxlen=2 * self.limits[endpoint_type]
+            )
+        limit = self._effective_limits[endpoint_type]
+        
+        cutoff = now - self.window_seconds
+        
+        # Calls are appended in time order, so the window is full exactly when
+        # the limit-th most recent call is still inside it. Expired entries
+        # don't need to be evicted first.
+        count = len(call_times)
+        if count >= limit:
+            oldest_in_window = call_times[count - limit]
+            if oldest_in_window >= cutoff:
+                return (oldest_in_window + self.window_seconds) - now
+        
+        # Record this call
+        call_times.append(now)
+        
+        # Once the ring is full, reclaim expired entries in one batch so
+        # get_stats and the deque stay small when traffic drops off
+        if count >= call_times.maxlen:
+            while call_times[0] < cutoff:
+                call_times.popleft()
+        
+        return 0.0
+    
     async def acquire(self, endpoint_type: EndpointType = EndpointType.READ) -> None:
         """
         Acquire permission to make an API call.
@@ -88,56 +134,60 @@ class SpotifyRateLimiter:
         Args:
             endpoint_type: Type of endpoint being called
         """
-        async with self._locks[endpoint_type]:
-            now = datetime.now(timezone.utc)
-            call_times = self.call_times[endpoint_type]
-            limit = int(self.limits[endpoint_type] / self._backoff_multiplier)
-            
-            # Remove calls outside the window
-            cutoff = now.timestamp() - self.window_seconds
-            while call_times and call_times[0] < cutoff:
-                call_times.popleft()
-            
-            # If at limit, wait for oldest call to expire
-            if len(call_times) >= limit:
-                oldest = call_times[0]
-                wait_time = (oldest + self.window_seconds) - now.timestamp()
+        # Fast path: room in the window and nobody queued, admitted without
+        # touching the lock. Checking the queue rather than lock.locked() keeps
+        # new callers from taking a slot in the gap between two waiters.
+        if not self._waiting.get(endpoint_type) and self._try_acquire(endpoint_type) == 0.0:
+            return
+        
+        lock = self._locks.get(endpoint_type)
+        if lock is None:
+            lock = self._locks[endpoint_type] = asyncio.Lock()
+        
+        # Slow path: waiters queue on the lock so they are admitted in order
+        self._waiting[endpoint_type] = self._waiting.get(endpoint_type, 0) + 1
+        try:
+            async with lock:
+                wait_time = self._try_acquire(endpoint_type)
                 
-                if wait_time > 0:
+                # If at limit, wait for oldest call to expire and try again
+                while wait_time > 0:
                     logger.debug(
-                        f"Rate limit reached for {endpoint_type.value}. "
-                        f"Waiting {wait_time:.2f}s"
+                        "Rate limit reached for %s. Waiting %.2fs",
+                        endpoint_type.value, wait_time
                     )
                     await asyncio.sleep(wait_time + 0.1)
-                    
-                    # Re-clean after waiting
-                    now = datetime.now(timezone.utc)
-                    cutoff = now.timestamp() - self.window_seconds
-                    while call_times and call_times[0] < cutoff:
-                        call_times.popleft()
-            
-            # Record this call
-            call_times.append(now.timestamp())
+                    wait_time = self._try_acquire(endpoint_type)
+        finally:
+            self._waiting[endpoint_type] -= 1
     
-    async def report_429(self) -> int:
+    async def report_429(self, retry_after: Optional[float] = None) -> float:
         """
         Report a 429 response from Spotify.
         
-        Increases backoff multiplier to slow down requests.
+        Increases backoff multiplier to slow down requests, and computes an
+        exponential backoff with jitter so concurrent callers don't all retry
+        on the same boundary. Spotify's Retry-After is honored as a floor.
+        
+        Args:
+            retry_after: Seconds from the response's Retry-After header, if any
         
         Returns:
             Recommended wait time in seconds
         """
         async with self._global_lock:
             self._consecutive_429s += 1
-            self._backoff_multiplier = min(4.0, 1.0 + (self._consecutive_429s * 0.5))
+            self._set_backoff_multiplier(min(4.0, 1.0 + (self._consecutive_429s * 0.5)))
             
-            wait_time = min(60, 5 * self._consecutive_429s)
+            # Exponent clamped so a long 429 streak can't overflow the float
+            computed = min(MAX_BACKOFF, BACKOFF_BASE * (2 ** min(self._consecutive_429s, 10)))
+            jitter = random.random() * BACKOFF_BASE
+            wait_time = max(computed + jitter, retry_after or 0.0)
             
             logger.warning(
-                f"Spotify 429 received. Consecutive: {self._consecutive_429s}, "
-                f"Backoff multiplier: {self._backoff_multiplier}, "
-                f"Wait: {wait_time}s"
+                "Spotify 429 received. Consecutive: %d, Backoff multiplier: %s, "
+                "Retry-After: %s, Wait: %.1fs",
+                self._consecutive_429s, self._backoff_multiplier, retry_after, wait_time
             )
             
             return wait_time
@@ -148,21 +198,23 @@ class SpotifyRateLimiter:
             async with self._global_lock:
                 self._consecutive_429s = max(0, self._consecutive_429s - 1)
                 if self._consecutive_429s == 0:
-                    self._backoff_multiplier = 1.0
+                    self._set_backoff_multiplier(1.0)
     
     def get_stats(self) -> Dict:
         """Get current rate limiter statistics."""
+        cutoff = time.monotonic() - self.window_seconds
         return {
             "window_seconds": self.window_seconds,
             "backoff_multiplier": self._backoff_multiplier,
             "consecutive_429s": self._consecutive_429s,
             "current_usage": {
-                endpoint_type.value: len(calls)
+                # Expired entries are reclaimed lazily, so count only the window
+                endpoint_type.value: sum(1 for t in calls if t >= cutoff)
                 for endpoint_type, calls in self.call_times.items()
             },
             "limits": {
-                endpoint_type.value: int(limit / self._backoff_multiplier)
-                for endpoint_type, limit in self.limits.items()
+                endpoint_type.value: limit
+                for endpoint_type, limit in self._effective_limits.items()
             }
         }
 
@@ -175,17 +227,7 @@ class UserProcessingLimiter:
     users at the same time.
     """
     
-    _instance: Optional['UserProcessingLimiter'] = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
     def __init__(self):
-        if hasattr(self, '_initialized') and self._initialized:
-            return
-        
         # Maximum concurrent user processing
         self.max_concurrent_users = 5
         self._semaphore = asyncio.Semaphore(self.max_concurrent_users)
@@ -193,25 +235,43 @@ class UserProcessingLimiter:
         # Delay between starting each user's processing
         self.inter_user_delay = 5.0  # seconds
         
-        # Track active processing
-        self._active_users: set = set()
-        self._lock = asyncio.Lock()
+        # Number of users being processed. Only mutated between awaits, so no lock needed
+        self._active_count = 0
+        
+        # Earliest monotonic time the next user may start, reserved by acquire
+        self._next_start_time = 0.0
         
-        self._initialized = True
-        logger.info(f"User processing limiter initialized (max concurrent: {self.max_concurrent_users})")
+        logger.info("User processing limiter initialized (max concurrent: %d)", self.max_concurrent_users)
     
     async def acquire(self, user_id: str) -> None:
         """
         Acquire a slot to process a user.
         
+        Starts are spaced inter_user_delay apart on the acquiring side, so
+        releasing a slot never has to wait.
+        
         Args:
             user_id: Unique identifier for the user
         """
         await self._semaphore.acquire()
         
-        async with self._lock:
-            self._active_users.add(user_id)
-            logger.info(f"Started processing user {user_id}. Active: {len(self._active_users)}")
+        # Reserve a start time before sleeping so concurrent acquirers stagger
+        now = time.monotonic()
+        start_at = max(now, self._next_start_time)
+        self._next_start_time = start_at + self.inter_user_delay
+        if start_at > now:
+            try:
+                await asyncio.sleep(start_at - now)
+            except BaseException:
+                # Cancelled while waiting: free the slot, and hand the start
+                # time back if no later acquirer has reserved after it
+                if self._next_start_time == start_at + self.inter_user_delay:
+                    self._next_start_time = start_at
+                self._semaphore.release()
+                raise
+        
+        self._active_count += 1
+        logger.info("Started processing user %s. Active: %d", user_id, self._active_count)
     
     async def release(self, user_id: str) -> None:
         """
@@ -220,29 +280,32 @@ class UserProcessingLimiter:
         Args:
             user_id: Unique identifier for the user
         """
-        async with self._lock:
-            self._active_users.discard(user_id)
-            logger.info(f"Finished processing user {user_id}. Active: {len(self._active_users)}")
+        self._active_count -= 1
+        logger.info("Finished processing user %s. Active: %d", user_id, self._active_count)
         
         self._semaphore.release()
-        
-        # Add delay before next user can start
-        await asyncio.sleep(self.inter_user_delay)
     
     def get_active_count(self) -> int:
         """Get the number of currently active user processing jobs."""
-        return len(self._active_users)
-    
-    def is_processing(self, user_id: str) -> bool:
-        """Check if a specific user is currently being processed."""
-        return user_id in self._active_users
+        return self._active_count
+
+
+# Global instances, created on first use
+_spotify_rate_limiter_instance: Optional[SpotifyRateLimiter] = None
+_user_processing_limiter_instance: Optional[UserProcessingLimiter] = None
 
 
 def get_spotify_rate_limiter() -> SpotifyRateLimiter:
     """Get the singleton Spotify rate limiter instance."""
-    return SpotifyRateLimiter()
+    global _spotify_rate_limiter_instance
+    if _spotify_rate_limiter_instance is None:
+        _spotify_rate_limiter_instance = SpotifyRateLimiter()
+    return _spotify_rate_limiter_instance
 
 
 def get_user_processing_limiter() -> UserProcessingLimiter:
     """Get the singleton user processing limiter instance."""
-    return UserProcessingLimiter()
+    global _user_processing_limiter_instance
+    if _user_processing_limiter_instance is None:
+        _user_processing_limiter_instance = UserProcessingLimiter()
+    return _user_processing_limiter_instance
@@ -11,11 +11,15 @@ Uses job queues and rate limiting to handle 1000+ concurrent users safely.
 
 import logging
 import asyncio
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+import httpx
+from cachetools import TTLCache
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from .config import get_settings
 from .firebase_service import get_firebase_service
@@ -26,28 +30,34 @@ from .job_queue import get_job_queue, JobPriority
 
 logger = logging.getLogger(__name__)
 
+# Maximum reminder emails in flight at once (SES send-rate headroom)
+EMAIL_CONCURRENCY = 10
+
+# Refresh Spotify access tokens that expire within this many seconds
+TOKEN_REFRESH_MARGIN_SECONDS = 600
+
 
 class SchedulerService:
     """Background job scheduler for periodic tasks with rate limiting support."""
     
-    _instance: Optional['SchedulerService'] = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        if hasattr(self, '_initialized') and self._initialized:
-            return
-            
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.settings = get_settings()
         self.scheduler = AsyncIOScheduler()
-        self.spotify_service = SpotifyService()
+        # Reuse the app's pooled client so token refreshes don't open new connections
+        self.spotify_service = SpotifyService(http_client=http_client)
         self._processing_service = None  # Lazy-loaded to use global instance
+        self.firebase = get_firebase_service()
+        self.email_service = get_email_service()
         self.user_limiter = get_user_processing_limiter()
         self.job_queue = get_job_queue()
-        self._initialized = True
+        
+        # Access tokens by user: (token, expiry as epoch seconds). Lets repeat
+        # scans within a token's lifetime skip the Firestore read and refresh
+        self._access_tokens: TTLCache = TTLCache(maxsize=10000, ttl=3600)
+        
+        # Bound once; these run for every scan job
+        self._acquire_user = self.user_limiter.acquire
+        self._release_user = self.user_limiter.release
         
         # Set up job handler
         self.job_queue.set_job_handler(self._execute_scan_job)
@@ -95,13 +105,23 @@ class SchedulerService:
             replace_existing=True
         )
         
+        # Resume first scans parked on Gemini Batch Mode
+        if self.settings.gemini_batch_mode:
+            self.scheduler.add_job(
+                self._resume_pending_batches,
+                IntervalTrigger(minutes=self.settings.gemini_batch_poll_minutes),
+                id='gemini_batch_poll',
+                name='Gemini Batch Results Poll',
+                replace_existing=True
+            )
+        
         # Start the scheduler
         self.scheduler.start()
         
         # Start the job queue worker
         await self.job_queue.start()
         
-        logger.info(f"Scheduler started. Daily scans at {self.settings.scan_hour_utc}:00 UTC")
+        logger.info("Scheduler started. Daily scans at %s:00 UTC", self.settings.scan_hour_utc)
     
     def stop(self):
         """Stop the scheduler gracefully."""
@@ -122,11 +142,11 @@ class SchedulerService:
         4. Each job updates last scan time
         """
         logger.info("Starting daily scans job - enqueueing to job queue")
-        firebase = get_firebase_service()
+        firebase = self.firebase
         
         try:
             active_users = await firebase.get_active_subscribers()
-            logger.info(f"Found {len(active_users)} active subscribers to scan")
+            logger.info("Found %d active subscribers to scan", len(active_users))
             
             # Get user IDs
             user_ids = [user.get('uid') for user in active_users if user.get('uid')]
@@ -141,12 +161,12 @@ class SchedulerService:
             )
             
             logger.info(
-                f"Daily scans enqueued: {len(job_ids)} jobs "
-                f"(stagger: {stagger_seconds}s, total spread: {len(job_ids) * stagger_seconds / 3600:.1f}h)"
+                "Daily scans enqueued: %d jobs (stagger: %ss, total spread: %.1fh)",
+                len(job_ids), stagger_seconds, len(job_ids) * stagger_seconds / 3600
             )
             
         except Exception as e:
-            logger.error(f"Daily scans job failed: {e}")
+            logger.error("Daily scans job failed: %s", e)
     
     async def _execute_scan_job(self, firebase_uid: str):
         """
@@ -155,13 +175,13 @@ class SchedulerService:
         This is called by the job queue worker.
         """
         # Acquire user processing slot
-        await self.user_limiter.acquire(firebase_uid)
+        await self._acquire_user(firebase_uid)
         
         try:
             await self._scan_user(firebase_uid)
         finally:
             # Release the slot
-            await self.user_limiter.release(firebase_uid)
+            await self._release_user(firebase_uid)
     
     async def _scan_user(self, firebase_uid: str):
         """
@@ -170,37 +190,22 @@ class SchedulerService:
         Args:
             firebase_uid: Firebase user ID
         """
-        firebase = get_firebase_service()
+        firebase = self.firebase
+        proc = self.processing_service
         
-        # Get Spotify tokens
-        tokens = await firebase.get_spotify_tokens(firebase_uid)
-        if not tokens:
-            logger.warning(f"No Spotify tokens for user {firebase_uid[:8]}***, skipping")
+        access_token = await self._get_access_token(firebase_uid)
+        if not access_token:
             return
         
-        access_token = tokens['access_token']
-        refresh_token = tokens['refresh_token']
-        expires_at = tokens.get('expires_at')
-        
-        # Check if token needs refresh
-        if expires_at:
-            now = datetime.now(timezone.utc)
-            # Refresh if expires within 10 minutes
-            if isinstance(expires_at, datetime) and expires_at <= now + timedelta(minutes=10):
-                access_token = await self._refresh_spotify_token(firebase_uid, refresh_token)
-                if not access_token:
-                    logger.error(f"Token refresh failed for user {firebase_uid[:8]}***")
-                    return
-        
         # Log scan start
         log_id = await firebase.log_scan_start(firebase_uid)
         
         try:
             # Run the processing pipeline
-            await self.processing_service.process(access_token, firebase_uid)
+            await proc.process(access_token, firebase_uid)
             
             # Get results from processing state
-            state = self.processing_service.get_state(firebase_uid)
+            state = proc.get_state(firebase_uid)
             
             # Log completion
             await firebase.log_scan_complete(
@@ -217,13 +222,99 @@ class SchedulerService:
                 next_scan_at=next_scan
             )
             
-            logger.info(f"Scan completed for user {firebase_uid[:8]}***: {state.processed_songs} songs")
+            logger.info("Scan completed for user %s***: %d songs", firebase_uid[:8], state.processed_songs)
             
         except Exception as e:
             await firebase.log_scan_complete(log_id, 0, 0, error=str(e))
             raise
         finally:
-            self.processing_service.clear_state(firebase_uid)
+            proc.clear_state(firebase_uid)
+    
+    async def _get_access_token(self, firebase_uid: str) -> Optional[str]:
+        """
+        Get a usable Spotify access token for a user, refreshing it if needed.
+        
+        Returns:
+            Access token or None if the user has no tokens or refresh failed
+        """
+        cached = self._access_tokens.get(firebase_uid)
+        if cached and time.time() + TOKEN_REFRESH_MARGIN_SECONDS < cached[1]:
+            return cached[0]
+        
+        firebase = self.firebase
+        
+        # Get Spotify tokens
+        tokens = await firebase.get_spotify_tokens(firebase_uid)
+        if not tokens:
+            logger.warning("No Spotify tokens for user %s***, skipping", firebase_uid[:8])
+            return None
+        
+        access_token = tokens['access_token']
+        refresh_token = tokens['refresh_token']
+        expires_at = tokens.get('expires_at')
+        
+        # Refresh if expires within 10 minutes, compared as epoch seconds
+        if isinstance(expires_at, datetime):
+            if expires_at.timestamp() <= time.time() + TOKEN_REFRESH_MARGIN_SECONDS:
+                access_token = await self._refresh_spotify_token(firebase_uid, refresh_token)
+                if not access_token:
+                    logger.error("Token refresh failed for user %s***", firebase_uid[:8])
+                    return None
+            else:
+                self._access_tokens[firebase_uid] = (access_token, expires_at.timestamp())
+        
+        return access_token
+    
+    async def _resume_pending_batches(self):
+        """
+        Resume first scans whose language detection went to Gemini Batch Mode.
+        
+        Each user with a pending batch is polled; finished batches continue
+        through the rest of the pipeline under the usual user limits.
+        """
+        firebase = self.firebase
+        
+        try:
+            user_ids = await firebase.get_pending_language_batch_user_ids()
+        except Exception as e:
+            logger.error("Failed to list pending Gemini batches: %s", e)
+            return
+        
+        if user_ids:
+            logger.info("Checking %d pending Gemini batches", len(user_ids))
+        
+        for firebase_uid in user_ids:
+            await self._acquire_user(firebase_uid)
+            try:
+                await self._resume_user_batch(firebase_uid)
+            except Exception as e:
+                logger.error("Failed to resume batch scan for user %s***: %s", firebase_uid[:8], e)
+            finally:
+                await self._release_user(firebase_uid)
+    
+    async def _resume_user_batch(self, firebase_uid: str):
+        """Resume a single user's batch-mode first scan if its results are ready."""
+        firebase = self.firebase
+        proc = self.processing_service
+        
+        access_token = await self._get_access_token(firebase_uid)
+        if not access_token:
+            return
+        
+        try:
+            completed = await proc.resume_from_batch(access_token, firebase_uid)
+            if not completed:
+                return
+            
+            state = proc.get_state(firebase_uid)
+            await firebase.update_user_scan_stats(
+                firebase_uid,
+                songs_processed=state.processed_songs,
+                next_scan_at=datetime.now(timezone.utc) + timedelta(days=1)
+            )
+            logger.info("Batch scan completed for user %s***: %d songs", firebase_uid[:8], state.processed_songs)
+        finally:
+            proc.clear_state(firebase_uid)
     
     async def _refresh_spotify_token(self, firebase_uid: str, refresh_token: str) -> Optional[str]:
         """
@@ -232,7 +323,7 @@ class SchedulerService:
         Returns:
             New access token or None if refresh failed
         """
-        firebase = get_firebase_service()
+        firebase = self.firebase
         
         try:
             tokens = await self.spotify_service.refresh_token(refresh_token)
@@ -242,12 +333,13 @@ class SchedulerService:
             expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
             
             await firebase.update_spotify_access_token(firebase_uid, access_token, expires_at)
+            self._access_tokens[firebase_uid] = (access_token, expires_at.timestamp())
             
-            logger.info(f"Refreshed Spotify token for user {firebase_uid[:8]}***")
+            logger.info("Refreshed Spotify token for user %s***", firebase_uid[:8])
             return access_token
             
         except Exception as e:
-            logger.error(f"Failed to refresh Spotify token: {e}")
+            logger.error("Failed to refresh Spotify token: %s", e)
             return None
     
     async def _check_expiring_subscriptions(self):
@@ -260,32 +352,38 @@ class SchedulerService:
         - Day of expiry
         """
         logger.info("Starting expiry check job")
-        firebase = get_firebase_service()
-        email_service = get_email_service()
+        firebase = self.firebase
+        email_service = self.email_service
         
         reminder_days = [10, 5, 0]
+        email_semaphore = asyncio.Semaphore(EMAIL_CONCURRENCY)
+        
+        async def send_one(user: dict, days: int):
+            uid = user.get('uid', '')[:8]
+            async with email_semaphore:
+                try:
+                    await email_service.send_expiry_reminder(
+                        to_email=user.get('email'),
+                        user_name=user.get('display_name', 'there'),
+                        days_remaining=days,
+                        end_date=user.get('subscription_end_date')
+                    )
+                except Exception as e:
+                    logger.error("Failed to send reminder to user %s***: %s", uid, e)
         
         for days in reminder_days:
             try:
                 users = await firebase.get_expiring_subscriptions(days)
-                logger.info(f"Found {len(users)} subscriptions expiring in {days} days")
+                logger.info("Found %d subscriptions expiring in %d days", len(users), days)
                 
-                for user in users:
-                    uid = user.get('uid', '')[:8]
-                    try:
-                        await email_service.send_expiry_reminder(
-                            to_email=user.get('email'),
-                            user_name=user.get('display_name', 'there'),
-                            days_remaining=days,
-                            end_date=user.get('subscription_end_date')
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send reminder to user {uid}***: {e}")
-                    
-                    await asyncio.sleep(0.5)  # Rate limit emails
+                # The semaphore bounds in-flight sends instead of a fixed sleep per email
+                await asyncio.gather(
+                    *(send_one(user, days) for user in users),
+                    return_exceptions=True
+                )
                     
             except Exception as e:
-                logger.error(f"Error checking {days}-day expiry: {e}")
+                logger.error("Error checking %d-day expiry: %s", days, e)
         
         logger.info("Expiry check job completed")
     
@@ -297,7 +395,7 @@ class SchedulerService:
         that expired the previous day.
         """
         logger.info("Starting expired subscription cleanup")
-        firebase = get_firebase_service()
+        firebase = self.firebase
         
         try:
             # Get subscriptions that expired yesterday or earlier
@@ -307,14 +405,14 @@ class SchedulerService:
                 uid = user.get('uid')
                 try:
                     await firebase.expire_subscription(uid)
-                    logger.info(f"Marked subscription as expired for user {uid}")
+                    logger.info("Marked subscription as expired for user %s", uid)
                 except Exception as e:
-                    logger.error(f"Failed to expire subscription for {uid}: {e}")
+                    logger.error("Failed to expire subscription for %s: %s", uid, e)
             
-            logger.info(f"Cleanup completed, processed {len(expired_users)} expired subscriptions")
+            logger.info("Cleanup completed, processed %d expired subscriptions", len(expired_users))
             
         except Exception as e:
-            logger.error(f"Expired subscription cleanup failed: {e}")
+            logger.error("Expired subscription cleanup failed: %s", e)
     
     # ============== Manual Triggers ==============
     
@@ -332,12 +430,12 @@ class SchedulerService:
         """
         if immediate:
             # For first scans or urgent requests, run immediately with limits
-            logger.info(f"Immediately executing scan for user {firebase_uid[:8]}***")
+            logger.info("Immediately executing scan for user %s***", firebase_uid[:8])
             await self._execute_scan_job(firebase_uid)
             return "immediate"
         else:
             # Queue with high priority for manual triggers
-            logger.info(f"Enqueueing high-priority scan for user {firebase_uid[:8]}***")
+            logger.info("Enqueueing high-priority scan for user %s***", firebase_uid[:8])
             job_id = await self.job_queue.enqueue(
                 user_id=firebase_uid,
                 job_type="manual_scan",
@@ -346,6 +444,10 @@ class SchedulerService:
             )
             return job_id
     
+    def invalidate_token(self, firebase_uid: str) -> None:
+        """Forget a user's cached access token after their Spotify tokens change or are deleted."""
+        self._access_tokens.pop(firebase_uid, None)
+    
     def get_queue_stats(self) -> dict:
         """Get job queue statistics for monitoring."""
         return self.job_queue.get_queue_stats()
@@ -358,7 +460,18 @@ class SchedulerService:
         await self.processing_service.close()
 
 
-def get_scheduler_service() -> SchedulerService:
-    """Get scheduler service singleton."""
-    return SchedulerService()
+_scheduler_service_instance: Optional[SchedulerService] = None
+
+
+def get_scheduler_service(http_client: Optional[httpx.AsyncClient] = None) -> SchedulerService:
+    """
+    Get scheduler service singleton.
+    
+    Args:
+        http_client: Shared HTTP client, used only when the instance is first created
+    """
+    global _scheduler_service_instance
+    if _scheduler_service_instance is None:
+        _scheduler_service_instance = SchedulerService(http_client=http_client)
+    return _scheduler_service_instance
 
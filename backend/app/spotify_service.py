@@ -11,10 +11,18 @@ when processing many users concurrently.
 """
 
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple, Callable, Awaitable
 from urllib.parse import urlencode
+import hashlib
 import logging
 import asyncio
+from operator import itemgetter
+
+from dataclasses import dataclass, field
+
+import orjson
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
 
 from .config import get_settings
 from .models import Track
@@ -29,30 +37,185 @@ SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
 SPOTIFY_API_BASE = "https://api.spotify.com/v1"
 
+# Fixed endpoint URLs, built once rather than per request
+SPOTIFY_ME_URL = f"{SPOTIFY_API_BASE}/me"
+SPOTIFY_LIKED_TRACKS_URL = f"{SPOTIFY_API_BASE}/me/tracks"
+SPOTIFY_MY_PLAYLISTS_URL = f"{SPOTIFY_API_BASE}/me/playlists"
+SPOTIFY_AUDIO_FEATURES_URL = f"{SPOTIFY_API_BASE}/audio-features"
+
+SPOTIFY_SCOPES = "user-library-read playlist-modify-public playlist-modify-private"
+
+# Audio features kept for classification, read off each feature object in one call
+_FEATURE_KEYS = (
+    "danceability", "energy", "tempo", "loudness", "speechiness", "acousticness",
+    "instrumentalness", "valence", "key", "mode", "time_signature", "liveness",
+)
+_feature_getter = itemgetter(*_FEATURE_KEYS)
+
+
+def _make_track(item: Dict[str, Any]) -> Track:
+    """Build a Track from a saved-track item whose track has an ID."""
+    track_data = item["track"]
+    album = track_data.get("album") or {}
+    
+    # With a market set, Spotify may relink to a playable copy; keep the saved ID
+    track_id = (track_data.get("linked_from") or {}).get("id") or track_data["id"]
+    
+    # Release dates are "YYYY", "YYYY-MM" or "YYYY-MM-DD"
+    year = (album.get("release_date") or "")[:4]
+    
+    return Track(
+        id=track_id,
+        name=track_data.get("name", "Unknown"),
+        artists=[a.get("name", "") for a in track_data.get("artists", ())],
+        album=album.get("name", "Unknown"),
+        release_year=int(year) if len(year) == 4 and year.isdigit() else None,
+        duration_ms=track_data.get("duration_ms", 0),
+        popularity=track_data.get("popularity", 0),
+        added_at=item.get("added_at")
+    )
+
+
+@dataclass
+class _PlaylistListing:
+    """
+    A cached playlist listing with its lookup indexes.
+    
+    by_id only holds playlists whose track totals are still current; a
+    playlist drops out of it as soon as tracks are added to it.
+    """
+    playlists: List[Dict[str, Any]]
+    by_name: Dict[Tuple[str, str], Dict[str, Any]] = field(default_factory=dict)
+    by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    
+    def __post_init__(self):
+        self._index_names()
+        self.by_id = {p["id"]: p for p in self.playlists if p.get("id")}
+    
+    def _index_names(self) -> None:
+        """Index playlists by (owner_id, name), keeping the first of any duplicates."""
+        self.by_name.clear()
+        for playlist in self.playlists:
+            key = ((playlist.get("owner") or {}).get("id"), playlist.get("name"))
+            self.by_name.setdefault(key, playlist)
+    
+    def add(self, playlist: Dict[str, Any]) -> None:
+        """Record a newly created playlist."""
+        self.playlists.append(playlist)
+        key = ((playlist.get("owner") or {}).get("id"), playlist.get("name"))
+        self.by_name.setdefault(key, playlist)
+        if playlist.get("id"):
+            self.by_id[playlist["id"]] = playlist
+    
+    def remove(self, playlist_id: str) -> None:
+        """Forget a deleted playlist."""
+        self.playlists[:] = [p for p in self.playlists if p.get("id") != playlist_id]
+        self.by_id.pop(playlist_id, None)
+        self._index_names()
+    
+    def mark_modified(self, playlist_id: str) -> None:
+        """Stop trusting the cached track total of a playlist being written to."""
+        self.by_id.pop(playlist_id, None)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the HTTP client shared by all Spotify service instances.
+    
+    A single pooled client keeps TCP/TLS connections to Spotify alive
+    across requests instead of paying a new handshake per service. HTTP/2
+    lets concurrent page and batch fetches multiplex over one connection.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=50,
+            keepalive_expiry=60
+        )
+    )
+
 
 class SpotifyService:
     """Service for interacting with Spotify Web API with global rate limiting."""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.settings = get_settings()
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # Shared clients are owned (and closed) by whoever created them
+        self._owns_client = http_client is None
+        self.client = http_client or create_http_client()
         self.rate_limiter = get_spotify_rate_limiter()
         
-    async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
-    
-    def generate_auth_url(self, state: str) -> str:
-        """Generate Spotify OAuth authorization URL."""
-        params = {
+        # Every HTTP request, including each page or chunk of a multi-request
+        # call, is capped in flight and throttled by a token bucket. The
+        # bucket only waits when near the cap, unlike a fixed sleep.
+        self._request_semaphore = asyncio.Semaphore(self.settings.spotify_concurrency)
+        self._request_limiter = AsyncLimiter(self.settings.spotify_requests_per_second, 1)
+        
+        # User profiles keyed by token hash; access tokens live for an hour
+        self._profile_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+        
+        # Playlist listings (_PlaylistListing) keyed by token hash. Short-lived;
+        # track totals are only served for playlists not written to since
+        self._playlists_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+        
+        # Requests currently in flight, so concurrent callers share one response
+        self._inflight: Dict[str, asyncio.Task] = {}
+        
+        # Prebuilt request headers per (token, json_body). The header has to
+        # hold the raw token anyway, so it's the key; entries expire with it
+        self._auth_headers: TTLCache = TTLCache(maxsize=2048, ttl=3600)
+        
+        # Authorization URL up to the per-request state parameter
+        self._auth_url_prefix = f"{SPOTIFY_AUTH_URL}?" + urlencode({
             "client_id": self.settings.spotify_client_id,
             "response_type": "code",
             "redirect_uri": self.settings.spotify_redirect_uri,
-            "scope": "user-library-read playlist-modify-public playlist-modify-private",
-            "state": state,
+            "scope": SPOTIFY_SCOPES,
             "show_dialog": "true"
-        }
-        return f"{SPOTIFY_AUTH_URL}?{urlencode(params)}"
+        })
+        
+    @staticmethod
+    def _token_key(access_token: str) -> str:
+        """Hash an access token for use as a cache key, so raw tokens aren't kept around."""
+        return hashlib.sha256(access_token.encode()).hexdigest()
+    
+    def _headers(self, access_token: str, json_body: bool = False) -> Dict[str, str]:
+        """Get the request headers for a token, built once per token."""
+        key = (access_token, json_body)
+        headers = self._auth_headers.get(key)
+        if headers is None:
+            headers = {"Authorization": f"Bearer {access_token}"}
+            if json_body:
+                headers["Content-Type"] = "application/json"
+            self._auth_headers[key] = headers
+        return headers
+    
+    async def _coalesce(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fetch once for all concurrent callers with the same key.
+        
+        Callers that arrive while a request for key is in flight await the
+        same task instead of issuing a duplicate request.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shielded so one caller being cancelled doesn't cancel the others' request
+        return await asyncio.shield(task)
+    
+    async def close(self):
+        """Close the HTTP client if this service owns it."""
+        if self._owns_client:
+            await self.client.aclose()
+    
+    def generate_auth_url(self, state: str) -> str:
+        """Generate Spotify OAuth authorization URL."""
+        return f"{self._auth_url_prefix}&{urlencode({'state': state})}"
     
     async def exchange_code(self, code: str) -> Dict[str, Any]:
         """Exchange authorization code for access token."""
@@ -74,7 +237,7 @@ class SpotifyService:
             logger.error(f"Token exchange failed: {response.text}")
             raise Exception(f"Failed to exchange code: {response.status_code}")
         
-        return response.json()
+        return orjson.loads(response.content)
     
     async def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh the access token."""
@@ -95,33 +258,94 @@ class SpotifyService:
             logger.error(f"Token refresh failed: {response.text}")
             raise Exception(f"Failed to refresh token: {response.status_code}")
         
-        return response.json()
+        return orjson.loads(response.content)
     
     async def get_current_user(self, access_token: str) -> Dict[str, Any]:
-        """Get current user's profile."""
+        """Get current user's profile (cached for the lifetime of the token)."""
+        token_key = self._token_key(access_token)
+        profile = self._profile_cache.get(token_key)
+        if profile is not None:
+            return profile
+        
+        return await self._coalesce(
+            f"me:{token_key}",
+            lambda: self._fetch_current_user(access_token, token_key)
+        )
+    
+    async def _fetch_current_user(self, access_token: str, token_key: str) -> Dict[str, Any]:
+        """Fetch the current user's profile and cache it."""
         response = await self.client.get(
-            f"{SPOTIFY_API_BASE}/me",
-            headers={"Authorization": f"Bearer {access_token}"}
+            SPOTIFY_ME_URL,
+            headers=self._headers(access_token)
         )
         
         if response.status_code != 200:
             raise Exception(f"Failed to get user profile: {response.status_code}")
         
-        return response.json()
+        profile = orjson.loads(response.content)
+        self._profile_cache[token_key] = profile
+        return profile
     
-    async def _handle_rate_limit(self, response: httpx.Response) -> int:
+    async def _handle_rate_limit(self, response: httpx.Response) -> float:
         """Handle rate limiting and return retry-after seconds."""
-        # Report to global rate limiter for adaptive throttling
-        recommended_wait = await self.rate_limiter.report_429()
-        
-        # Use the higher of Spotify's Retry-After or our recommended wait
-        retry_after = max(
-            int(response.headers.get("Retry-After", 1)),
-            recommended_wait
-        )
-        logger.warning(f"Rate limited. Retry after {retry_after} seconds")
+        try:
+            server_retry_after = float(response.headers.get("Retry-After", 1))
+        except ValueError:
+            server_retry_after = None
+        
+        # Report to global rate limiter for adaptive throttling; Spotify's
+        # Retry-After is used as the floor for the jittered backoff
+        retry_after = await self.rate_limiter.report_429(server_retry_after)
+        logger.warning(f"Rate limited. Retry after {retry_after:.1f} seconds")
         return retry_after
     
+    async def _request_with_retry(
+        self,
+        method: str,
+        url: str,
+        access_token: str,
+        endpoint_type: EndpointType = EndpointType.READ,
+        max_retries: int = 3,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a Spotify API request under the rate limiters, retrying on 429.
+        
+        Each retry sleeps the backoff from the rate limiter, which is already
+        jittered so users rate limited together don't retry in lockstep.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            access_token: Spotify access token
+            endpoint_type: Rate limit bucket for the request
+            max_retries: Attempts before giving up on 429s
+            **kwargs: Passed to the HTTP client (params, content)
+        
+        Returns:
+            The last response; still a 429 if every attempt was rate limited
+        """
+        headers = self._headers(access_token, json_body="content" in kwargs)
+        
+        for attempt in range(max_retries):
+            await self.rate_limiter.acquire(endpoint_type)
+            
+            async with self._request_semaphore:
+                async with self._request_limiter:
+                    response = await self.client.request(method, url, headers=headers, **kwargs)
+            
+            if response.status_code != 429:
+                if response.is_success:
+                    # Report success for adaptive rate limiting
+                    await self.rate_limiter.report_success()
+                return response
+            
+            retry_after = await self._handle_rate_limit(response)
+            if attempt < max_retries - 1:
+                await asyncio.sleep(retry_after)
+        
+        return response
+    
     async def get_liked_songs(
         self, 
         access_token: str, 
@@ -129,42 +353,77 @@ class SpotifyService:
         offset: int = 0
     ) -> Dict[str, Any]:
         """Fetch user's liked songs with pagination and rate limiting."""
-        max_retries = 3
+        response = await self._request_with_retry(
+            "GET",
+            SPOTIFY_LIKED_TRACKS_URL,
+            access_token,
+            # A market makes Spotify drop each track's ~180-entry available_markets
+            params={"limit": limit, "offset": offset, "market": "from_token"}
+        )
         
-        for attempt in range(max_retries):
-            # Acquire rate limit token before making request
-            await self.rate_limiter.acquire(EndpointType.READ)
+        if response.status_code == 429:
+            raise Exception("Rate limited while fetching liked songs")
+        
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch liked songs: {response.status_code}")
+        
+        return orjson.loads(response.content)
+    
+    def _parse_liked_items(
+        self,
+        items: List[Dict[str, Any]],
+        limit: int,
+        since_timestamp: Optional[str] = None
+    ) -> Tuple[List[Track], bool]:
+        """
+        Convert a page of saved-track items into Track objects.
+        
+        Args:
+            items: Items from a /me/tracks page
+            limit: Maximum number of tracks to take from this page
+            since_timestamp: Stop at the first song added at or before this ISO timestamp
+        
+        Returns:
+            Tuple of (tracks, reached_old_songs)
+        """
+        if not since_timestamp:
+            # Full scans have nothing to stop at, so skip the per-item checks
+            valid = [item for item in items if item.get("track") and item["track"].get("id")]
+            return [_make_track(item) for item in valid[:limit]], False
+        
+        page = []
+        for item in items:
+            if len(page) >= limit:
+                break
             
-            response = await self.client.get(
-                f"{SPOTIFY_API_BASE}/me/tracks",
-                params={"limit": limit, "offset": offset},
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
+            # Get the added_at timestamp
+            added_at = item.get("added_at")
             
-            if response.status_code == 429:
-                retry_after = await self._handle_rate_limit(response)
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_after)
-                    continue
-                raise Exception(f"Rate limited. Retry after {retry_after} seconds")
+            # Check if this track is older than the previous scan
+            if added_at and added_at <= since_timestamp:
+                # This song and all subsequent ones are old, stop fetching
+                logger.info(f"Reached songs from previous scan at {added_at}")
+                return page, True
             
-            if response.status_code != 200:
-                raise Exception(f"Failed to fetch liked songs: {response.status_code}")
-            
-            # Report success for adaptive rate limiting
-            await self.rate_limiter.report_success()
-            return response.json()
+            track_data = item.get("track")
+            if track_data and track_data.get("id"):
+                page.append(_make_track(item))
         
-        raise Exception("Max retries exceeded for fetching liked songs")
+        return page, False
     
-    async def fetch_all_liked_songs(
+    async def iter_liked_song_pages(
         self, 
         access_token: str, 
         max_songs: int = 1000,
         since_timestamp: Optional[str] = None
-    ) -> List[Track]:
+    ) -> AsyncIterator[List[Track]]:
         """
-        Fetch liked songs up to max_songs limit.
+        Yield liked songs one page at a time, up to max_songs.
+        
+        Lets callers start working on the first pages while later ones are
+        still being fetched. Full scans fetch the remaining pages concurrently
+        once the first page reports the library size; incremental scans stay
+        sequential so they can stop at the first already-seen song.
         
         Args:
             access_token: Spotify access token
@@ -172,78 +431,79 @@ class SpotifyService:
             since_timestamp: If provided, only fetch songs added after this ISO timestamp.
                            Stops fetching when we hit older songs.
         
-        Returns:
-            List of Track objects (newest first if since_timestamp is used)
+        Yields:
+            Lists of Track objects, newest first
         """
-        tracks = []
-        offset = 0
+        fetched = 0
         batch_size = 50
-        reached_old_songs = False
         
-        while offset < max_songs and not reached_old_songs:
-            result = await self.get_liked_songs(
-                access_token, 
-                limit=batch_size, 
-                offset=offset
-            )
-            
-            items = result.get("items", [])
-            if not items:
-                break
+        if since_timestamp:
+            offset = 0
+            reached_old_songs = False
             
-            for item in items:
-                if len(tracks) >= max_songs:
-                    break
+            while offset < max_songs and not reached_old_songs:
+                result = await self.get_liked_songs(
+                    access_token, 
+                    limit=batch_size, 
+                    offset=offset
+                )
                 
-                # Get the added_at timestamp
-                added_at = item.get("added_at")
+                items = result.get("items", [])
+                if not items:
+                    break
                 
-                # If we have a since_timestamp, check if this track is older
-                if since_timestamp and added_at:
-                    if added_at <= since_timestamp:
-                        # This song and all subsequent ones are old, stop fetching
-                        reached_old_songs = True
-                        logger.info(f"Reached songs from previous scan at {added_at}")
-                        break
-                    
-                track_data = item.get("track", {})
-                if not track_data or not track_data.get("id"):
-                    continue
+                page, reached_old_songs = self._parse_liked_items(
+                    items, max_songs - fetched, since_timestamp
+                )
+                if page:
+                    fetched += len(page)
+                    yield page
                 
-                # Extract release year from album
-                release_date = track_data.get("album", {}).get("release_date", "")
-                release_year = None
-                if release_date:
-                    try:
-                        release_year = int(release_date[:4])
-                    except (ValueError, IndexError):
-                        pass
+                offset += batch_size
                 
-                track = Track(
-                    id=track_data["id"],
-                    name=track_data.get("name", "Unknown"),
-                    artists=[a.get("name", "") for a in track_data.get("artists", [])],
-                    album=track_data.get("album", {}).get("name", "Unknown"),
-                    release_year=release_year,
-                    duration_ms=track_data.get("duration_ms", 0),
-                    popularity=track_data.get("popularity", 0),
-                    added_at=added_at
-                )
-                tracks.append(track)
-            
-            offset += batch_size
-            
-            if len(items) < batch_size:
-                break
+                if len(items) < batch_size:
+                    break
             
-            # Small delay to avoid rate limiting
-            await asyncio.sleep(0.1)
+            logger.info(f"Fetched {fetched} NEW liked songs (since {since_timestamp})")
+            return
         
-        if since_timestamp:
-            logger.info(f"Fetched {len(tracks)} NEW liked songs (since {since_timestamp})")
-        else:
-            logger.info(f"Fetched {len(tracks)} liked songs (full scan)")
-        return tracks
+        # Full scan: the first page tells us how many pages remain
+        first = await self.get_liked_songs(access_token, limit=batch_size, offset=0)
+        total = min(first.get("total", 0), max_songs)
+        
+        # The global rate limiter still paces these; the semaphore bounds fan-out
+        semaphore = asyncio.Semaphore(self.settings.spotify_concurrency)
+        
+        async def fetch_page(offset: int) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.get_liked_songs(access_token, limit=batch_size, offset=offset)
+        
+        tasks = [
+            asyncio.create_task(fetch_page(offset))
+            for offset in range(batch_size, total, batch_size)
+        ]
+        
+        try:
+            # Yield in offset order while later pages keep downloading
+            for i in range(len(tasks) + 1):
+                result = first if i == 0 else await tasks[i - 1]
+                
+                items = result.get("items", [])
+                if not items:
+                    break
+                
+                page, _ = self._parse_liked_items(items, max_songs - fetched)
+                if page:
+                    fetched += len(page)
+                    yield page
+                
+                if fetched >= max_songs:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        logger.info(f"Fetched {fetched} liked songs (full scan)")
     
     async def get_audio_features(
         self, 
@@ -253,85 +513,137 @@ class SpotifyService:
         """
         Get all audio features for multiple tracks.
         Returns all features needed for genre classification.
+        
+        Spotify deprecated /audio-features for new apps, so this returns an
+        empty dict without calling Spotify unless use_audio_features is set.
         """
-        if not track_ids:
+        if not self.settings.use_audio_features or not track_ids:
             return {}
         
-        # Spotify allows max 100 tracks per request
+        # Spotify allows max 100 tracks per request. Batches run concurrently;
+        # the global rate limiter paces them, the semaphore bounds fan-out
+        semaphore = asyncio.Semaphore(self.settings.spotify_concurrency)
+        
+        # Opened when a batch stays rate limited through all its retries;
+        # batches that haven't started yet would only 429 again, so skip them
+        circuit_open = asyncio.Event()
+        
+        async def fetch_batch(batch_ids: List[str]) -> Dict[str, Dict[str, float]]:
+            async with semaphore:
+                if circuit_open.is_set():
+                    return {}
+                batch_features = await self._fetch_features_batch(access_token, batch_ids)
+            if batch_features is None:
+                circuit_open.set()
+                return {}
+            return batch_features
+        
+        results = await asyncio.gather(*(
+            fetch_batch(track_ids[i:i+100])
+            for i in range(0, len(track_ids), 100)
+        ))
+        
         features = {}
-        max_retries = 3
+        for batch_features in results:
+            features.update(batch_features)
         
-        for i in range(0, len(track_ids), 100):
-            batch_ids = track_ids[i:i+100]
-            
-            for attempt in range(max_retries):
-                # Acquire rate limit token for batch operations
-                await self.rate_limiter.acquire(EndpointType.BATCH)
-                
-                response = await self.client.get(
-                    f"{SPOTIFY_API_BASE}/audio-features",
-                    params={"ids": ",".join(batch_ids)},
-                    headers={"Authorization": f"Bearer {access_token}"}
-                )
-                
-                if response.status_code == 429:
-                    retry_after = await self._handle_rate_limit(response)
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_after)
-                        continue
-                    logger.error(f"Rate limited while fetching audio features")
-                    break
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    for feature in data.get("audio_features", []):
-                        if feature and feature.get("id"):
-                            # Extract ALL features needed for classification
-                            features[feature["id"]] = {
-                                "danceability": feature.get("danceability"),
-                                "energy": feature.get("energy"),
-                                "tempo": feature.get("tempo"),
-                                "loudness": feature.get("loudness"),
-                                "speechiness": feature.get("speechiness"),
-                                "acousticness": feature.get("acousticness"),
-                                "instrumentalness": feature.get("instrumentalness"),
-                                "valence": feature.get("valence"),
-                                "key": feature.get("key"),
-                                "mode": feature.get("mode"),
-                                "time_signature": feature.get("time_signature"),
-                                "liveness": feature.get("liveness"),
-                            }
-                    break
-                else:
-                    logger.warning(f"Failed to fetch audio features: {response.status_code}")
-                    break
-            
-            # Small delay between batches
-            await asyncio.sleep(0.1)
+        if circuit_open.is_set():
+            logger.warning(f"Circuit open; returning partial features for {len(features)} tracks")
+            return features
         
         logger.info(f"Fetched audio features for {len(features)} tracks")
         return features
     
-    async def get_user_playlists(self, access_token: str) -> List[Dict[str, Any]]:
-        """Get all playlists owned by the current user with rate limiting."""
+    async def _fetch_features_batch(
+        self,
+        access_token: str,
+        batch_ids: List[str]
+    ) -> Optional[Dict[str, Dict[str, float]]]:
+        """
+        Fetch audio features for up to 100 tracks, retrying on 429.
+        
+        Returns None if the batch was still rate limited after every retry.
+        """
+        features = {}
+        
+        response = await self._request_with_retry(
+            "GET",
+            SPOTIFY_AUDIO_FEATURES_URL,
+            access_token,
+            EndpointType.BATCH,
+            params={"ids": ",".join(batch_ids)}
+        )
+        
+        if response.status_code == 429:
+            logger.error(f"Rate limited while fetching audio features")
+            return None
+        elif response.status_code == 200:
+            data = orjson.loads(response.content)
+            for feature in data.get("audio_features", []):
+                if feature and feature.get("id"):
+                    # Extract ALL features needed for classification
+                    try:
+                        values = _feature_getter(feature)
+                    except KeyError:
+                        values = map(feature.get, _FEATURE_KEYS)
+                    features[feature["id"]] = dict(zip(_FEATURE_KEYS, values))
+        else:
+            logger.warning(f"Failed to fetch audio features: {response.status_code}")
+        
+        return features
+    
+    async def get_user_playlists(
+        self, 
+        access_token: str, 
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all playlists owned by the current user with rate limiting.
+        
+        Args:
+            access_token: Spotify access token
+            use_cache: Serve a listing fetched in the last 60 seconds if there is one.
+                       Pass False when up-to-date track totals matter; the fresh
+                       listing still refreshes the cache.
+        
+        Returns:
+            List of playlist dicts
+        """
+        token_key = self._token_key(access_token)
+        if use_cache:
+            cached = self._playlists_cache.get(token_key)
+            if cached is not None:
+                return list(cached.playlists)
+        
+        # Concurrent callers share the same listing; each gets its own copy
+        playlists = await self._coalesce(
+            f"playlists:{token_key}",
+            lambda: self._fetch_user_playlists(access_token, token_key)
+        )
+        return list(playlists)
+    
+    async def _fetch_user_playlists(self, access_token: str, token_key: str) -> List[Dict[str, Any]]:
+        """Page through the user's playlists and cache the listing if complete."""
         playlists = []
         offset = 0
+        complete = True
         
         while True:
             # Acquire rate limit token
             await self.rate_limiter.acquire(EndpointType.READ)
             
             response = await self.client.get(
-                f"{SPOTIFY_API_BASE}/me/playlists",
+                SPOTIFY_MY_PLAYLISTS_URL,
                 params={"limit": 50, "offset": offset},
-                headers={"Authorization": f"Bearer {access_token}"}
+                headers=self._headers(access_token)
             )
             
             if response.status_code != 200:
                 logger.warning(f"Failed to fetch playlists: {response.status_code} - {response.text}")
+                complete = False
                 break
             
-            data = response.json()
+            data = orjson.loads(response.content)
             items = data.get("items", [])
             playlists.extend(items)
             
@@ -340,10 +652,15 @@ class SpotifyService:
             if len(items) < 50:
                 break
             offset += 50
-            
-            await asyncio.sleep(0.1)
         
         logger.info(f"Total playlists fetched: {len(playlists)}")
+        
+        # Don't let a partial listing hide playlists from later lookups
+        if complete:
+            self._playlists_cache[token_key] = _PlaylistListing(list(playlists))
+        else:
+            self._playlists_cache.pop(token_key, None)
+        
         return playlists
 
     
@@ -367,15 +684,16 @@ class SpotifyService:
         """
         playlists = await self.get_user_playlists(access_token)
         
-        for playlist in playlists:
-            # Check if playlist name matches and user owns it
-            if playlist.get("name") == name:
-                owner = playlist.get("owner", {})
-                if owner.get("id") == user_id:
-                    logger.info(f"Found existing playlist: {name} ({playlist.get('id')})")
-                    return playlist
+        # The index is built once per cached listing; a listing that couldn't
+        # be cached (a page failed) gets a throwaway index
+        cached = self._playlists_cache.get(self._token_key(access_token))
+        listing = cached if cached is not None else _PlaylistListing(playlists)
         
-        return None
+        # Name must match and the user must own it
+        playlist = listing.by_name.get((user_id, name))
+        if playlist:
+            logger.info(f"Found existing playlist: {name} ({playlist.get('id')})")
+        return playlist
     
     async def get_or_create_playlist(
         self, 
@@ -419,97 +737,171 @@ class SpotifyService:
         public: bool = False
     ) -> Dict[str, Any]:
         """Create a new playlist with rate limiting."""
-        max_retries = 3
+        response = await self._request_with_retry(
+            "POST",
+            f"{SPOTIFY_API_BASE}/users/{user_id}/playlists",
+            access_token,
+            EndpointType.WRITE,
+            content=orjson.dumps({
+                "name": name,
+                "description": description,
+                "public": public
+            })
+        )
         
-        for attempt in range(max_retries):
-            # Acquire rate limit token for write operation
-            await self.rate_limiter.acquire(EndpointType.WRITE)
-            
-            response = await self.client.post(
-                f"{SPOTIFY_API_BASE}/users/{user_id}/playlists",
-                json={
-                    "name": name,
-                    "description": description,
-                    "public": public
-                },
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Content-Type": "application/json"
-                }
-            )
-            
-            if response.status_code == 429:
-                retry_after = await self._handle_rate_limit(response)
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_after)
-                    continue
-                raise Exception(f"Rate limited while creating playlist")
-            
-            if response.status_code not in (200, 201):
-                raise Exception(f"Failed to create playlist: {response.status_code}")
-            
-            return response.json()
+        if response.status_code == 429:
+            raise Exception(f"Rate limited while creating playlist")
+        
+        if response.status_code not in (200, 201):
+            raise Exception(f"Failed to create playlist: {response.status_code}")
+        
+        playlist = orjson.loads(response.content)
+        
+        # Keep a cached listing in step so the new playlist is found by name
+        cached = self._playlists_cache.get(self._token_key(access_token))
+        if cached is not None:
+            cached.add(playlist)
         
-        raise Exception("Max retries exceeded for creating playlist")
+        return playlist
     
     async def add_tracks_to_playlist(
         self, 
         access_token: str, 
         playlist_id: str, 
-        track_uris: List[str]
+        track_uris: List[str],
+        preserve_order: bool = True
     ) -> bool:
-        """Add tracks to a playlist with rate limiting. Max 100 tracks per request."""
-        max_retries = 3
+        """
+        Add tracks to a playlist with rate limiting. Max 100 tracks per request.
         
-        for i in range(0, len(track_uris), 100):
-            batch_uris = track_uris[i:i+100]
-            
-            for attempt in range(max_retries):
-                # Acquire rate limit token for write operation
-                await self.rate_limiter.acquire(EndpointType.WRITE)
-                
-                response = await self.client.post(
-                    f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
-                    json={"uris": batch_uris},
-                    headers={
-                        "Authorization": f"Bearer {access_token}",
-                        "Content-Type": "application/json"
-                    }
-                )
-                
-                if response.status_code == 429:
-                    retry_after = await self._handle_rate_limit(response)
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(retry_after)
-                        continue
-                    logger.error(f"Rate limited while adding tracks")
-                    return False
-                
-                if response.status_code not in (200, 201):
-                    logger.error(f"Failed to add tracks: {response.text}")
+        Args:
+            access_token: Spotify access token
+            playlist_id: Playlist to append to
+            track_uris: Spotify track URIs, in the order they should appear
+            preserve_order: Send batches one after another so they land in order.
+                            When False, batches are sent concurrently and may
+                            land in any order relative to each other.
+        
+        Returns:
+            True if every batch was added
+        """
+        # Any batch may land, even if a later one fails, so the cached total is stale
+        cached = self._playlists_cache.get(self._token_key(access_token))
+        if cached is not None:
+            cached.mark_modified(playlist_id)
+        
+        batches = [track_uris[i:i+100] for i in range(0, len(track_uris), 100)]
+        
+        if preserve_order:
+            for batch_uris in batches:
+                if not await self._add_tracks_batch(access_token, playlist_id, batch_uris):
                     return False
-                
-                break
-            
-            # Small delay between batches
-            await asyncio.sleep(0.1)
+            return True
+        
+        # Spotify appends each request at the end of the playlist as it lands, so
+        # explicit positions can't keep concurrent batches in order
+        semaphore = asyncio.Semaphore(4)
+        
+        async def add_batch(batch_uris: List[str]) -> bool:
+            async with semaphore:
+                return await self._add_tracks_batch(access_token, playlist_id, batch_uris)
+        
+        results = await asyncio.gather(*(add_batch(batch_uris) for batch_uris in batches))
+        return all(results)
+    
+    async def _add_tracks_batch(
+        self,
+        access_token: str,
+        playlist_id: str,
+        batch_uris: List[str]
+    ) -> bool:
+        """Append up to 100 tracks to a playlist, retrying on 429."""
+        response = await self._request_with_retry(
+            "POST",
+            f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
+            access_token,
+            EndpointType.WRITE,
+            content=orjson.dumps({"uris": batch_uris})
+        )
+        
+        if response.status_code == 429:
+            logger.error(f"Rate limited while adding tracks")
+            return False
+        
+        if response.status_code not in (200, 201):
+            logger.error(f"Failed to add tracks: {response.text}")
+            return False
         
         return True
     
+    async def get_playlist_track_ids(
+        self, 
+        access_token: str, 
+        playlist_id: str
+    ) -> List[str]:
+        """
+        Get the IDs of all tracks already in a playlist.
+        
+        Only the track IDs are requested (via ``fields``) to keep pages small.
+        
+        Raises:
+            Exception: If a page could not be fetched
+        """
+        track_ids = []
+        offset = 0
+        
+        while True:
+            response = await self._request_with_retry(
+                "GET",
+                f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/tracks",
+                access_token,
+                params={"limit": 100, "offset": offset, "fields": "items(track(id)),next"}
+            )
+            
+            if response.status_code == 429:
+                raise Exception("Rate limited while fetching playlist tracks")
+            
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch playlist tracks: {response.status_code}")
+            
+            data = orjson.loads(response.content)
+            for item in data.get("items", []):
+                track = item.get("track") or {}
+                if track.get("id"):
+                    track_ids.append(track["id"])
+            
+            if not data.get("next"):
+                break
+            offset += 100
+        
+        return track_ids
+    
     async def get_playlist_track_count(
         self, 
         access_token: str, 
         playlist_id: str
     ) -> int:
-        """Get the number of tracks in a playlist."""
+        """
+        Get the number of tracks in a playlist.
+        
+        Served from a cached playlist listing when the playlist hasn't been
+        written to since it was fetched; otherwise asks Spotify.
+        """
+        cached = self._playlists_cache.get(self._token_key(access_token))
+        if cached is not None:
+            playlist = cached.by_id.get(playlist_id)
+            total = (playlist.get("tracks") or {}).get("total") if playlist else None
+            if isinstance(total, int):
+                return total
+        
         response = await self.client.get(
             f"{SPOTIFY_API_BASE}/playlists/{playlist_id}",
             params={"fields": "tracks.total"},
-            headers={"Authorization": f"Bearer {access_token}"}
+            headers=self._headers(access_token)
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             return data.get("tracks", {}).get("total", 0)
         
         return 0
@@ -518,7 +910,15 @@ class SpotifyService:
         """Unfollow (delete) a playlist."""
         response = await self.client.delete(
             f"{SPOTIFY_API_BASE}/playlists/{playlist_id}/followers",
-            headers={"Authorization": f"Bearer {access_token}"}
+            headers=self._headers(access_token)
         )
         
-        return response.status_code == 200
+        if response.status_code != 200:
+            return False
+        
+        # Updated in place so the entry keeps its original expiry
+        cached = self._playlists_cache.get(self._token_key(access_token))
+        if cached is not None:
+            cached.remove(playlist_id)
+        
+        return True
@@ -923,6 +923,7 @@ function getStatusTitle(status) {
     'idle': 'Ready',
     'fetching_songs': 'Fetching Your Music',
     'detecting_languages': 'Detecting Languages',
+    'awaiting_batch': 'Queued for Organizing',
     'building_artist_map': 'Analyzing Artists',
     'classifying_artists': 'Classifying by Genre',
     'creating_playlists': 'Creating Playlists',